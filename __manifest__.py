@@ -1,6 +1,6 @@
 {
     'name': 'Odoo Partner Monitor',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.3.0',
     'summary': 'Monitor and track Odoo official partners daily',
     'category': 'Tools',
     'author': 'Majdhsien1@gmail.com',
@@ -18,6 +18,9 @@
         'views/partner_views.xml',
         'views/history_views.xml',
         'views/reference_views.xml',
+        'views/crawl_run_views.xml',
+        'views/stat_snapshot_views.xml',
+        'views/page_archive_views.xml',
         'report/partner_report_templates.xml',
         'views/dashboard_menu.xml',
         'views/menus.xml',
@@ -0,0 +1,46 @@
+import json
+import logging
+
+from odoo import api, fields, http
+from odoo.http import request, content_disposition
+
+from ..tools import partner_export
+
+_logger = logging.getLogger(__name__)
+
+
+class PartnerExportController(http.Controller):
+
+    @http.route('/azk_partner_monitor/export/<string:file_format>', type='http', auth='user')
+    def export_partners(self, file_format, ids=None, domain=None):
+        """Stream the partners of ``ids`` or ``domain`` as a CSV or XLSX file.
+
+        The ids are resolved in the request transaction, where access rights
+        are checked; the rows are then read from a cursor of their own while
+        the response is sent, since the request cursor is closed by then.
+        """
+        if file_format not in partner_export.EXPORT_FORMATS:
+            raise request.not_found()
+        Partner = request.env['azk.partner.partner']
+        if domain is not None:
+            partner_ids = Partner.search(json.loads(domain)).ids
+        else:
+            partner_ids = Partner.browse([int(i) for i in (ids or '').split(',') if i]).exists().ids
+        Partner.browse(partner_ids).check_access('read')
+
+        chunk_size = int(request.env['ir.config_parameter'].sudo().get_param(
+            'azk_odoo_partner_monitor.export_chunk_size', '1000')) or 1000
+        writer = partner_export.iter_csv if file_format == 'csv' else partner_export.iter_xlsx
+        registry, uid, context = request.env.registry, request.env.uid, dict(request.env.context)
+
+        def stream():
+            with registry.cursor() as cr:
+                partners = api.Environment(cr, uid, context)['azk.partner.partner'].browse(partner_ids)
+                yield from writer(partners._get_export_header(), partners._iter_export_rows(chunk_size))
+            _logger.info("Exported %d partners as %s", len(partner_ids), file_format)
+
+        filename = f"partners-{fields.Date.to_string(fields.Date.today())}.{file_format}"
+        return request.make_response(stream(), headers=[
+            ('Content-Type', partner_export.EXPORT_FORMATS[file_format]),
+            ('Content-Disposition', content_disposition(filename)),
+        ])
@@ -0,0 +1,68 @@
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Key partners on their odoo.com id and merge the rows that share one.
+
+    Partners used to be matched by name, so a renamed partner got a second
+    row with the same profile URL. The newest row holds the current data: it
+    is kept, inherits the history of the older rows and their first seen
+    date, and the older rows are dropped before the unique constraint on
+    ``odoo_partner_id`` is created.
+    """
+    if not version:
+        return
+
+    cr.execute("""
+        ALTER TABLE azk_partner_partner ADD COLUMN IF NOT EXISTS odoo_partner_id integer;
+        UPDATE azk_partner_partner
+           SET odoo_partner_id = substring(regexp_replace(partner_url, '[?#].*$', '') FROM '[/-](\\d+)/?$')::integer
+         WHERE partner_url IS NOT NULL
+    """)
+
+    cr.execute("""
+        SELECT p.id, k.keep_id
+          FROM azk_partner_partner p
+          JOIN (
+              SELECT odoo_partner_id, max(id) AS keep_id
+                FROM azk_partner_partner
+               WHERE odoo_partner_id IS NOT NULL
+            GROUP BY odoo_partner_id
+              HAVING count(*) > 1
+          ) k ON k.odoo_partner_id = p.odoo_partner_id
+         WHERE p.id != k.keep_id
+    """)
+    merged = cr.fetchall()
+    if not merged:
+        return
+
+    cr.execute("CREATE TEMPORARY TABLE azk_partner_merge (old_id integer, keep_id integer) ON COMMIT DROP")
+    cr.execute(
+        "INSERT INTO azk_partner_merge (old_id, keep_id) VALUES %s" % ', '.join(['%s'] * len(merged)),
+        merged,
+    )
+    cr.execute("""
+        UPDATE azk_partner_status_history h SET partner_id = m.keep_id
+          FROM azk_partner_merge m WHERE h.partner_id = m.old_id;
+        UPDATE azk_partner_reference r SET partner_id = m.keep_id
+          FROM azk_partner_merge m WHERE r.partner_id = m.old_id;
+        UPDATE mail_message msg SET res_id = m.keep_id
+          FROM azk_partner_merge m
+         WHERE msg.model = 'azk.partner.partner' AND msg.res_id = m.old_id;
+        UPDATE azk_partner_partner p SET first_seen_on = f.first_seen_on
+          FROM (
+              SELECT m.keep_id, min(o.first_seen_on) AS first_seen_on
+                FROM azk_partner_merge m
+                JOIN azk_partner_partner o ON o.id = m.old_id
+            GROUP BY m.keep_id
+          ) f
+         WHERE p.id = f.keep_id AND f.first_seen_on < p.first_seen_on;
+        DELETE FROM mail_followers f USING azk_partner_merge m
+         WHERE f.res_model = 'azk.partner.partner' AND f.res_id = m.old_id;
+        DELETE FROM mail_activity a USING azk_partner_merge m
+         WHERE a.res_model = 'azk.partner.partner' AND a.res_id = m.old_id;
+        DELETE FROM azk_partner_partner p USING azk_partner_merge m WHERE p.id = m.old_id;
+    """)
+    _logger.info("Merged %d duplicate partners into %d", len(merged), len({keep_id for _old, keep_id in merged}))
@@ -0,0 +1,16 @@
+def migrate(cr, version):
+    """Store the reference counts as integers instead of strings.
+
+    Values that are not plain numbers (e.g. the "False" written for partners
+    without a count) become NULL.
+    """
+    if not version:
+        return
+
+    cr.execute("""
+        ALTER TABLE azk_partner_reference
+            ALTER COLUMN reference_count TYPE integer
+                USING CASE WHEN btrim(reference_count) ~ '^-?\\d+$' THEN btrim(reference_count)::integer END,
+            ALTER COLUMN old_reference_count TYPE integer
+                USING CASE WHEN btrim(old_reference_count) ~ '^-?\\d+$' THEN btrim(old_reference_count)::integer END
+    """)
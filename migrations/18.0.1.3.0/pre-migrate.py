@@ -0,0 +1,64 @@
+import logging
+
+from odoo.tools.sql import table_exists
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Merge the countries that share a name before their name becomes unique.
+
+    Concurrent crawls could each create a country they did not find. The
+    oldest row is kept and takes over the partners, the statistics and the
+    directory slug of the others; partner counts are recomputed.
+    """
+    if not version:
+        return
+
+    cr.execute("""
+        SELECT c.id, k.keep_id
+          FROM azk_partner_country c
+          JOIN (
+              SELECT name, min(id) AS keep_id
+                FROM azk_partner_country
+            GROUP BY name
+              HAVING count(*) > 1
+          ) k ON k.name = c.name
+         WHERE c.id != k.keep_id
+    """)
+    merged = cr.fetchall()
+    if not merged:
+        return
+
+    cr.execute("CREATE TEMPORARY TABLE azk_country_merge (old_id integer, keep_id integer) ON COMMIT DROP")
+    cr.execute(
+        "INSERT INTO azk_country_merge (old_id, keep_id) VALUES %s" % ', '.join(['%s'] * len(merged)),
+        merged,
+    )
+    # Databases upgraded from 18.0.1.0.0 get the statistics table later on
+    if table_exists(cr, 'azk_partner_stat_snapshot'):
+        cr.execute("""
+            UPDATE azk_partner_stat_snapshot s SET country_id = m.keep_id
+              FROM azk_country_merge m WHERE s.country_id = m.old_id
+        """)
+    cr.execute("""
+        UPDATE azk_partner_partner p SET country_id = m.keep_id
+          FROM azk_country_merge m WHERE p.country_id = m.old_id;
+        UPDATE azk_partner_country c
+           SET slug = COALESCE(c.slug, o.slug),
+               odoo_country_id = COALESCE(c.odoo_country_id, o.odoo_country_id),
+               active = c.active OR o.active
+          FROM (
+              SELECT m.keep_id, max(o.slug) AS slug, max(o.odoo_country_id) AS odoo_country_id,
+                     bool_or(o.active) AS active
+                FROM azk_country_merge m
+                JOIN azk_partner_country o ON o.id = m.old_id
+            GROUP BY m.keep_id
+          ) o
+         WHERE c.id = o.keep_id;
+        DELETE FROM azk_partner_country c USING azk_country_merge m WHERE c.id = m.old_id;
+        UPDATE azk_partner_country c
+           SET total_partner_count = (SELECT count(*) FROM azk_partner_partner p WHERE p.country_id = c.id)
+         WHERE c.id IN (SELECT keep_id FROM azk_country_merge);
+    """)
+    _logger.info("Merged %d duplicate countries into %d", len(merged), len({keep_id for _old, keep_id in merged}))
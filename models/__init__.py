@@ -3,4 +3,10 @@ from . import partner_partner
 from . import partner_reference
 from . import partner_status_history
 from . import res_config_settings
-from . import partner_monitor_mixin
\ No newline at end of file
+from . import partner_monitor_mixin
+from . import partner_page_cache
+from . import partner_crawl_run
+from . import partner_stat_snapshot
+from . import partner_reference_segment
+from . import ir_actions_report
+from . import partner_page_archive
@@ -0,0 +1,48 @@
+import io
+import logging
+import tempfile
+from contextlib import ExitStack
+
+from odoo import models
+from odoo.tools import split_every
+from odoo.tools.pdf import PdfFileReader, PdfFileWriter
+
+_logger = logging.getLogger(__name__)
+
+PARTNER_REPORT = 'azk_odoo_partner_monitor.partner_report_document'
+
+
+class IrActionsReport(models.Model):
+    _inherit = 'ir.actions.report'
+
+    def _render_qweb_pdf(self, report_ref, res_ids=None, data=None):
+        """Render large partner reports in chunks of ``report_chunk_size`` partners.
+
+        Each chunk is a separate wkhtmltopdf run over a bounded HTML page,
+        and the cache is emptied between chunks. The chunk PDFs are spilled
+        to temporary files and their pages added to one writer, which reads
+        them back from the files when the merged PDF is written.
+        """
+        if isinstance(res_ids, int):
+            res_ids = [res_ids]
+        report = self._get_report(report_ref)
+        chunk_size = int(self.env['ir.config_parameter'].sudo().get_param(
+            'azk_odoo_partner_monitor.report_chunk_size', '200'))
+        if report.report_name != PARTNER_REPORT or not res_ids or not chunk_size or len(res_ids) <= chunk_size:
+            return super()._render_qweb_pdf(report_ref, res_ids=res_ids, data=data)
+
+        _logger.info("Rendering the partner report of %d partners in chunks of %d", len(res_ids), chunk_size)
+        writer = PdfFileWriter()
+        with ExitStack() as stack:
+            for ids in split_every(chunk_size, res_ids):
+                pdf_content, _report_type = super()._render_qweb_pdf(report_ref, res_ids=list(ids), data=data)
+                chunk = stack.enter_context(tempfile.TemporaryFile())
+                chunk.write(pdf_content)
+                del pdf_content
+                reader = PdfFileReader(chunk, strict=False)
+                for page in range(reader.getNumPages()):
+                    writer.addPage(reader.getPage(page))
+                self.env.invalidate_all()
+            with io.BytesIO() as buffer:
+                writer.write(buffer)
+                return buffer.getvalue(), 'pdf'
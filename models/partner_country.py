@@ -1,6 +1,9 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from odoo import models, fields, api
-from .partner_monitor_mixin import PartnerMonitorMixin
+from .partner_monitor_mixin import PartnerMonitorMixin, exclusive_job
+from ..tools import partner_parser
 _logger = logging.getLogger(__name__)
 
 
@@ -21,57 +24,184 @@ class PartnerCountry(models.Model, PartnerMonitorMixin):
         store=True
     )
     to_reprocess_partners = fields.Boolean(string='To Reprocess', default=False)
-    slug = fields.Char(string="Country Slug")
+    slug = fields.Char(string="Country Slug", index=True)
     odoo_country_id = fields.Char(string="Odoo Country ID")
 
+    _sql_constraints = [
+        ('name_uniq', 'unique(name)', 'A country with this name already exists.'),
+    ]
+
     @api.depends('partner_ids')
     def _compute_counts(self):
+        # The ORM recomputes every touched country at once when it flushes,
+        # so one grouped count serves the whole batch without loading the
+        # partner lists of large countries.
+        counts = dict(self.env['azk.partner.partner']._read_group(
+            [('country_id', 'in', self.ids)], ['country_id'], ['__count'],
+        ))
         for rec in self:
-            rec.total_partner_count = len(rec.partner_ids)
+            rec.total_partner_count = counts.get(rec, 0)
+
+    @api.model
+    def _get_or_create_by_names(self, names):
+        """Map country names to ids, creating the missing countries in one batch.
+
+        Names are unique: a crawl creating a country that a concurrent one
+        just created fails on the constraint and is retried by its caller.
+        """
+        names = list(names)
+        # Archived countries keep their name, creating them again would fail
+        country_map = {c.name: c.id for c in self.with_context(active_test=False).search([('name', 'in', names)])}
+        missing = [name for name in names if name not in country_map]
+        if missing:
+            country_map.update({c.name: c.id for c in self.create([{'name': name} for name in missing])})
+        return country_map
+
+    @api.model
+    def _sync_country_directory(self):
+        """Store the slug and odoo.com id of every country listed on the partner index page.
+
+        The index is downloaded and parsed once; existing countries are
+        updated in one statement and unknown ones created in one batch.
+        """
+        Partner = self.env['azk.partner.partner']
+        result = Partner._fetch_page(f"{Partner._get_directory_url()}/partners")
+        if result.error:
+            _logger.error("Failed to sync the partner country directory: %s", result.error)
+            return 0
+        directory = {
+            name: (slug, odoo_id)
+            for name, slug, odoo_id in partner_parser.parse_country_directory(result.body, Partner._get_parser_backend())
+        }
+        if not directory:
+            _logger.warning("No countries found on the partner index page.")
+            return 0
+
+        existing = {c.name: c.id for c in self.with_context(active_test=False).search([('name', 'in', list(directory))])}
+        rows = [(existing[name], slug, odoo_id) for name, (slug, odoo_id) in directory.items() if name in existing]
+        if rows:
+            self.flush_model(['slug', 'odoo_country_id'])
+            self.env.cr.execute("""
+                UPDATE azk_partner_country c
+                SET slug = v.slug, odoo_country_id = v.odoo_country_id
+                FROM (VALUES %s) AS v(id, slug, odoo_country_id)
+                WHERE c.id = v.id
+                  AND (c.slug IS DISTINCT FROM v.slug OR c.odoo_country_id IS DISTINCT FROM v.odoo_country_id)
+            """ % ', '.join(['%s'] * len(rows)), rows)
+            self.invalidate_model(['slug', 'odoo_country_id'])
+        self.create([
+            {'name': name, 'slug': slug, 'odoo_country_id': odoo_id}
+            for name, (slug, odoo_id) in directory.items() if name not in existing
+        ])
+        _logger.info("Synced the partner directory of %d countries", len(directory))
+        return len(directory)
 
     @api.model
+    def _get_slug_and_odoo_id(self, country_name):
+        """Resolve a country from the stored directory, syncing it at most once per run on a miss."""
+        country = self.with_context(active_test=False).search(
+            [('name', '=ilike', country_name), ('slug', '!=', False)], limit=1,
+        )
+        if not country and not self.env.context.get('partner_directory_synced'):
+            self._sync_country_directory()
+            return self.with_context(partner_directory_synced=True)._get_slug_and_odoo_id(country_name)
+        return (country.slug, country.odoo_country_id) if country else (None, None)
+
+    @api.model
+    @exclusive_job
     def cron_validate_countries(self):
+        """Compare stored partner counts with one grouped count over all partners.
+
+        Mismatching countries are flagged and corrected in a single
+        statement, and countries whose counts match again are unflagged
+        with one write.
+        """
         try:
             Partner = self.env['azk.partner.partner']
-            for country in self.search([]):
-                actual_count = Partner.search_count([('country_id', '=', country.id)])
+            actual_counts = {
+                country.id: count
+                for country, count in Partner._read_group([('country_id', '!=', False)], ['country_id'], ['__count'])
+            }
+            mismatched, matching_flagged = [], []
+            for country in self.search_fetch([], ['name', 'total_partner_count', 'to_reprocess_partners']):
+                actual_count = actual_counts.get(country.id, 0)
                 if actual_count != country.total_partner_count:
-                    country.write({
-                        'to_reprocess_partners': True,
-                        'total_partner_count': actual_count,
-                    })
+                    mismatched.append((country.id, actual_count))
                     _logger.info(
                         "Country %s flagged for reprocess (was %s, now %s)",
                         country.name, country.total_partner_count, actual_count
                     )
-                else:
+                elif country.to_reprocess_partners:
                     # reset flag if counts match
-                    if country.to_reprocess_partners:
-                        country.to_reprocess_partners = False
+                    matching_flagged.append(country.id)
+
+            if mismatched:
+                self.flush_model(['total_partner_count', 'to_reprocess_partners'])
+                self.env.cr.execute("""
+                    UPDATE azk_partner_country c
+                    SET to_reprocess_partners = TRUE,
+                        total_partner_count = v.actual_count,
+                        write_uid = %%s,
+                        write_date = (now() at time zone 'UTC')
+                    FROM (VALUES %s) AS v(id, actual_count)
+                    WHERE c.id = v.id
+                """ % ', '.join(['%s'] * len(mismatched)), [self.env.uid, *mismatched])
+                self.invalidate_model(['total_partner_count', 'to_reprocess_partners', 'write_uid', 'write_date'])
+            if matching_flagged:
+                self.browse(matching_flagged).write({'to_reprocess_partners': False})
         except Exception as e:
             self._post_cron_error('cron_validate_countries', str(e))
             _logger.exception("Error in cron_validate_countries")
 
     @api.model
+    @exclusive_job
     def cron_reprocess_flagged_countries(self):
-        params = self.env['ir.config_parameter'].sudo()
-        partner = self.env['azk.partner.partner']
-        flagged = self.search([('to_reprocess_partners', '=', True)])
+        """Re-crawl flagged countries concurrently, each in its own transaction.
 
-        for country in flagged:
-            try:
-                # Set temporary parameters
-                params.set_param('azk_odoo_partner_monitor.partner_fetch_mode', 'specific_c')
-                params.set_param('azk_odoo_partner_monitor.partner_country_id', str(country.id))
+        At most ``partner_country_concurrency`` countries are crawled at the
+        same time; every country's results are committed independently, so
+        one failing country does not undo the others.
+        """
+        flagged = self.search([('to_reprocess_partners', '=', True)])
+        if not flagged:
+            return
+        # Refresh slugs once for the whole run, country lookups then need no HTTP
+        self._sync_country_directory()
+        self.env.cr.commit()
 
-                # Fetch and update partner data for the country
-                partner.fetch_partner_data()
+        params = self.env['ir.config_parameter'].sudo()
+        max_workers = int(params.get_param('azk_odoo_partner_monitor.partner_country_concurrency', '4'))
+        jobs = [(country.id, country.name) for country in flagged]
+        _logger.info("Reprocessing %d flagged countries, %d at a time", len(jobs), max_workers)
 
-                # Clear reprocess flag
-                country.to_reprocess_partners = False
-                _logger.info("Reprocessed country %s", country.name)
+        failed = []
+        with ThreadPoolExecutor(max_workers=max(1, min(len(jobs), max_workers))) as pool:
+            futures = {pool.submit(self._reprocess_country_job, *job): job[1] for job in jobs}
+            for future in as_completed(futures):
+                if not future.result():
+                    failed.append(futures[future])
+        # Start a new transaction so the snapshot sees what the jobs committed
+        self.env.cr.commit()
+        self.env['azk.partner.partner']._after_crawl()
+        if failed:
+            self._post_cron_error(
+                'cron_reprocess_flagged_countries',
+                "Failed to reprocess countries: %s" % ', '.join(sorted(failed)),
+            )
 
-            finally:
-                # Always clear parameters to avoid side effects
-                params.search([('key', '=', 'azk_odoo_partner_monitor.partner_fetch_mode')]).unlink()
-                params.search([('key', '=', 'azk_odoo_partner_monitor.partner_country_id')]).unlink()
+    def _reprocess_country_job(self, country_id, country_name):
+        """Crawl one country with a dedicated cursor; runs in a worker thread."""
+        try:
+            with self.pool.cursor() as cr:
+                env = api.Environment(cr, self.env.uid, dict(self.env.context, partner_directory_synced=True))
+                crawled = env['azk.partner.partner'].fetch_partner_data(
+                    mode='specific_c', country_name=country_name, run_type='country')
+                if not crawled:
+                    _logger.warning("Country %s was not crawled, it stays flagged", country_name)
+                    return False
+                env['azk.partner.country'].browse(country_id).to_reprocess_partners = False
+            _logger.info("Reprocessed country %s", country_name)
+            return True
+        except Exception:
+            _logger.exception("Failed to reprocess country %s", country_name)
+            return False
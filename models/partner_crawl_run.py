@@ -0,0 +1,336 @@
+import logging
+import os
+import socket
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+import psycopg2.errors
+from markupsafe import Markup
+
+from odoo import models, fields, api, _
+from odoo.tools.profiler import Profiler
+
+from ..tools import crawl_stats
+
+_logger = logging.getLogger(__name__)
+
+
+class PartnerCrawlRun(models.Model):
+    _name = 'azk.partner.crawl.run'
+    _inherit = ['mail.thread']
+    _description = 'Partner Crawl Run'
+    _order = 'started_on desc, id desc'
+
+    name = fields.Char(string='Run', required=True)
+    run_type = fields.Selection([
+        ('fetch', 'Partner Fetch'),
+        ('country', 'Country Reprocess'),
+        ('partner', 'Partner Reprocess'),
+        ('replay', 'Archive Replay'),
+    ], string='Type', default='fetch', required=True, index=True)
+    module_version = fields.Char(string='Module Version', readonly=True)
+    run_key = fields.Char(string='Run Key', required=True, index=True,
+                          help="Identifies the crawl target, runs with the same key resume each other.")
+    state = fields.Selection([
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('abandoned', 'Abandoned'),
+    ], string='State', default='running', required=True, index=True)
+    started_on = fields.Datetime(string='Started On', default=fields.Datetime.now, readonly=True)
+    finished_on = fields.Datetime(string='Finished On', readonly=True)
+    resume_count = fields.Integer(string='Resumed', default=0, readonly=True)
+    records_count = fields.Integer(string='Scraped Records', default=0, readonly=True)
+    page_ids = fields.One2many('azk.partner.crawl.page', 'run_id', string='Pages')
+    page_count = fields.Integer(string='Pages', compute='_compute_page_stats')
+    pages_done = fields.Integer(string='Pages Done', compute='_compute_page_stats')
+    pages_failed = fields.Integer(string='Pages Failed', compute='_compute_page_stats')
+    shard_size = fields.Integer(string='Shard Size', readonly=True,
+                                help="Pages per shard claimed by the crawl workers; 0 when the run is not sharded.")
+    shard_ids = fields.One2many('azk.partner.crawl.shard', 'run_id', string='Shards')
+
+    # Instrumentation, accumulated over the resumptions of the run
+    duration = fields.Float(string='Duration (s)', readonly=True)
+    discovery_time = fields.Float(string='Page Discovery (s)', readonly=True)
+    http_wait_time = fields.Float(string='HTTP Wait (s)', readonly=True,
+                                  help="Time spent waiting on odoo.com, summed over concurrent requests.")
+    parse_time = fields.Float(string='Parsing (s)', readonly=True,
+                              help="Summed over the parser processes when they are enabled.")
+    upsert_time = fields.Float(string='Upsert (s)', readonly=True, help="Saving the partners, history excluded.")
+    history_time = fields.Float(string='History Writes (s)', readonly=True)
+    pages_fetched = fields.Integer(string='Pages Fetched', readonly=True)
+    kb_fetched = fields.Integer(string='Downloaded (KB)', readonly=True)
+    retries = fields.Integer(string='Retries', readonly=True)
+    throttled = fields.Integer(string='Throttled (429/5xx)', readonly=True)
+    cache_hits = fields.Integer(string='Cache Hits', readonly=True)
+    partners_created = fields.Integer(string='Partners Created', readonly=True)
+    partners_updated = fields.Integer(string='Partners Updated', readonly=True)
+    partners_unchanged = fields.Integer(string='Partners Unchanged', readonly=True)
+    history_rows = fields.Integer(string='History Rows', readonly=True)
+    digest = fields.Json(string='Change Digest', readonly=True)
+
+    def _compute_page_stats(self):
+        counts = {
+            (run.id, state): count
+            for run, state, count in self.env['azk.partner.crawl.page']._read_group(
+                [('run_id', 'in', self.ids)], ['run_id', 'state'], ['__count'],
+            )
+        }
+        for run in self:
+            run.pages_done = counts.get((run.id, 'done'), 0)
+            run.pages_failed = counts.get((run.id, 'failed'), 0)
+            run.page_count = run.pages_done + run.pages_failed + counts.get((run.id, 'pending'), 0)
+
+    @api.model
+    def _get_resumable(self, run_key):
+        """Return the unfinished run for ``run_key``, abandoning runs that are too old to resume."""
+        params = self.env['ir.config_parameter'].sudo()
+        resume_hours = int(params.get_param('azk_odoo_partner_monitor.partner_crawl_resume_hours', '24'))
+        runs = self.search([('run_key', '=', run_key), ('state', '=', 'running')])
+        limit = fields.Datetime.now() - timedelta(hours=resume_hours)
+        stale = runs.filtered(lambda r: r.started_on < limit)
+        if stale:
+            stale.write({'state': 'abandoned', 'finished_on': fields.Datetime.now()})
+            _logger.info("Abandoned %d crawl runs too old to resume", len(stale))
+        return (runs - stale)[:1]
+
+    @api.model
+    def _start(self, name, run_key, urls, run_type='fetch'):
+        module = self.env['ir.module.module'].sudo().search([('name', '=', 'azk_odoo_partner_monitor')], limit=1)
+        params = self.env['ir.config_parameter'].sudo()
+        return self.create({
+            'name': name,
+            'run_key': run_key,
+            'run_type': run_type,
+            'module_version': module.latest_version,
+            'shard_size': int(params.get_param('azk_odoo_partner_monitor.partner_crawl_shard_pages', '0')) if urls else 0,
+            'page_ids': [fields.Command.create({'sequence': seq, 'url': url}) for seq, url in enumerate(urls, 1)],
+        })
+
+    def _get_pages_to_crawl(self, retry_budget):
+        """Pending pages, plus failed pages that still have attempts left."""
+        self.ensure_one()
+        return self.env['azk.partner.crawl.page'].search([
+            ('run_id', '=', self.id),
+            '|', ('state', '=', 'pending'),
+                 '&', ('state', '=', 'failed'), ('attempts', '<', retry_budget),
+        ])
+
+    def _claim_pages(self, retry_budget):
+        """Lock the next shard of pages to crawl until the end of the transaction.
+
+        Pages locked by other workers are skipped, so concurrent workers
+        claim disjoint shards, and the shard of a worker that dies is freed
+        with its transaction. The claim should open its transaction: a page
+        another worker checkpointed after the transaction started cannot be
+        locked, and the claim is then retried in a new transaction.
+        """
+        self.ensure_one()
+        Page = self.env['azk.partner.crawl.page']
+        Page.flush_model(['state', 'attempts'])
+        for _attempt in range(3):
+            try:
+                self.env.cr.execute("""
+                    SELECT id FROM azk_partner_crawl_page
+                     WHERE run_id = %s AND (state = 'pending' OR (state = 'failed' AND attempts < %s))
+                  ORDER BY sequence
+                     LIMIT %s
+                       FOR NO KEY UPDATE SKIP LOCKED
+                """, [self.id, retry_budget, self.shard_size])
+                return Page.browse([row[0] for row in self.env.cr.fetchall()])
+            except psycopg2.errors.SerializationFailure:
+                self.env.cr.rollback()
+        return Page
+
+    def _mark_pages(self, done_urls, failed_urls):
+        """Checkpoint page outcomes with one statement per outcome."""
+        self.ensure_one()
+        cr = self.env.cr
+        if done_urls:
+            cr.execute("""
+                UPDATE azk_partner_crawl_page SET state = 'done', attempts = attempts + 1
+                WHERE run_id = %s AND url IN %s
+            """, [self.id, tuple(done_urls)])
+        if failed_urls:
+            cr.execute("""
+                UPDATE azk_partner_crawl_page SET state = 'failed', attempts = attempts + 1
+                WHERE run_id = %s AND url IN %s
+            """, [self.id, tuple(failed_urls)])
+        self.env['azk.partner.crawl.page'].invalidate_model(['state', 'attempts'])
+
+    def _add_stats(self, stats):
+        """Drain a ``CrawlStats`` into the run; resumptions add up."""
+        self._add_drained(stats.drain())
+
+    def _add_drained(self, drained):
+        self.ensure_one()
+        counters = drained['counters']
+        vals = {
+            'duration': self.duration + drained['elapsed'],
+            'kb_fetched': self.kb_fetched + counters.pop('bytes_fetched', 0) // 1024,
+        }
+        for stage, seconds in drained['timings'].items():
+            vals[f'{stage}_time'] = self[f'{stage}_time'] + seconds
+        for name, value in counters.items():
+            vals[name] = self[name] + value
+        if drained['digest']:
+            vals['digest'] = crawl_stats.merge_digest(self.digest or {}, drained['digest'])
+        self.write(vals)
+
+    def _merge_shards(self):
+        """Add the counters and changes the crawl workers recorded on their shards to the run.
+
+        Workers never write the run itself, so they do not contend on its
+        row. Their wall time is left out: the run lasts as long as the
+        crawl that waited for them.
+        """
+        self.ensure_one()
+        drained = {}
+        for shard in self.shard_ids.filtered('stats'):
+            drained = crawl_stats.merge_drained(drained, dict(shard.stats, elapsed=0.0))
+        if drained:
+            self._add_drained(drained)
+        self.records_count += sum(self.shard_ids.mapped('records_count'))
+
+    @api.model
+    def _get_shard_worker_crons(self):
+        """The crawl worker cron and its copies, one per cron worker helping the sharded crawls."""
+        base = self.env.ref('azk_odoo_partner_monitor.ir_cron_crawl_shards', raise_if_not_found=False)
+        if not base:
+            return self.env['ir.cron']
+        return base | self.env['ir.cron'].with_context(active_test=False).search(
+            [('code', '=', base.code), ('model_id', '=', base.model_id.id), ('id', '!=', base.id)], order='id',
+        )
+
+    @api.model
+    def _sync_shard_workers(self, count):
+        """Keep ``count`` crawl worker crons, copying or deleting copies of the base one."""
+        crons = self._get_shard_worker_crons()
+        if not crons:
+            return
+        base, copies = crons[:1], crons[1:]
+        missing = max(count, 1) - len(crons)
+        for index in range(missing):
+            base.copy({'name': f"{base.name} {len(crons) + index + 1}"})
+        if missing < 0:
+            copies[missing:].unlink()
+
+    @api.model
+    def _trigger_shard_workers(self):
+        for cron in self._get_shard_worker_crons().filtered('active'):
+            cron._trigger()
+
+    @api.model
+    def _cron_crawl_shards(self):
+        """Help the running sharded crawls: claim and crawl their shards until none is left."""
+        params = self.env['ir.config_parameter'].sudo()
+        retry_budget = int(params.get_param('azk_odoo_partner_monitor.partner_crawl_page_retries', '3'))
+        runs = self.search([('state', '=', 'running'), ('shard_size', '>', 0)])
+        # Start with a new transaction, the claims must see the latest checkpoints
+        self.env.cr.commit()
+        Partner = self.env['azk.partner.partner']
+        for run in runs:
+            stats = crawl_stats.CrawlStats()
+            shards = Partner.with_context(partner_crawl_stats=stats, tracking_disable=True)._crawl_shards(
+                run, retry_budget, worker=True)
+            if shards:
+                _logger.info("Crawled %d shards of %s", shards, run.name)
+
+    def _finish(self):
+        self.write({'state': 'done', 'finished_on': fields.Datetime.now()})
+        for run in self:
+            run._post_digest()
+
+    def _post_digest(self):
+        """Post the changes of the run as a single note, in place of per-partner tracking."""
+        self.ensure_one()
+        if not self.digest:
+            return
+        sections = [
+            ('created', _("New partners")),
+            ('promoted', _("Promotions")),
+            ('demoted', _("Demotions")),
+            ('initial', _("First status")),
+            ('references', _("Reference changes")),
+        ]
+        body = Markup()
+        for kind, label in sections:
+            part = self.digest.get(kind)
+            if not part:
+                continue
+            title = f"{label}: {part['count']}"
+            if kind == 'references':
+                title += _(" (net %+d)", part['delta'])
+            items = Markup().join(Markup("<li>%s</li>") % sample for sample in part['samples'])
+            if part['count'] > len(part['samples']):
+                items += Markup("<li>%s</li>") % _("... and %s more", part['count'] - len(part['samples']))
+            body += Markup("<p><b>%s</b></p><ul>%s</ul>") % (title, items)
+        self.message_post(body=body, subject=_("Changes of %s", self.name), subtype_xmlid='mail.mt_note')
+
+    @contextmanager
+    def _profile(self):
+        """Sample the crawl with the Odoo profiler and keep the profile of slow runs.
+
+        Opt-in through ``crawl_profile_min_seconds``: when the ``with``
+        block lasts longer, the profile is saved as an ``ir.profile`` record
+        whose session is the run name.
+        """
+        self.ensure_one()
+        params = self.env['ir.config_parameter'].sudo()
+        min_seconds = int(params.get_param('azk_odoo_partner_monitor.crawl_profile_min_seconds', '0'))
+        if min_seconds <= 0:
+            yield
+            return
+
+        profiler = Profiler(
+            collectors=['traces_async'], db=None, profile_session=self.name,
+            description=self.name, params={'traces_async_interval': 0.01},
+        )
+        start = time.monotonic()
+        with profiler:
+            try:
+                yield
+            finally:
+                # The profiler only saves its entries when it has a database
+                if time.monotonic() - start >= min_seconds:
+                    profiler.db = self.env.cr.dbname
+                    _logger.info("Saving the profile of slow crawl run %s", self.name)
+
+    def action_view_profiles(self):
+        self.ensure_one()
+        action = self.env['ir.actions.act_window']._for_xml_id('base.action_menu_ir_profile')
+        action['domain'] = [('session', '=', self.name)]
+        return action
+
+
+class PartnerCrawlPage(models.Model):
+    _name = 'azk.partner.crawl.page'
+    _description = 'Partner Crawl Page'
+    _order = 'run_id, sequence'
+
+    run_id = fields.Many2one('azk.partner.crawl.run', string='Run', required=True, ondelete='cascade', index=True)
+    sequence = fields.Integer(string='Page')
+    url = fields.Char(string='URL', required=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='State', default='pending', required=True, index=True)
+    attempts = fields.Integer(string='Attempts', default=0)
+
+
+class PartnerCrawlShard(models.Model):
+    _name = 'azk.partner.crawl.shard'
+    _description = 'Partner Crawl Shard'
+    _order = 'run_id, id'
+
+    run_id = fields.Many2one('azk.partner.crawl.run', string='Run', required=True, ondelete='cascade', index=True)
+    worker = fields.Char(string='Worker', readonly=True, default=lambda self: f"{socket.gethostname()}:{os.getpid()}")
+    page_count = fields.Integer(string='Pages', readonly=True)
+    records_count = fields.Integer(string='Scraped Records', default=0, readonly=True)
+    stats = fields.Json(string='Counters', readonly=True)
+
+    def _add_stats(self, stats):
+        """Drain a ``CrawlStats`` into the shard, the run sums its shards when it finishes."""
+        self.ensure_one()
+        self.stats = crawl_stats.merge_drained(self.stats or {}, stats.drain())
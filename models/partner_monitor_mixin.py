@@ -1,9 +1,23 @@
+import functools
 import logging, time
+from contextlib import contextmanager
 from psycopg2 import  DatabaseError
+from psycopg2.extensions import TRANSACTION_STATUS_INERROR
 from odoo import models, api, _
 
 _logger = logging.getLogger(__name__)
 
+
+def exclusive_job(method):
+    """Skip a call of the decorated job while another worker runs it, see ``_job_lock``."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._job_lock(method.__name__) as acquired:
+            if acquired:
+                return method(self, *args, **kwargs)
+    return wrapper
+
+
 class PartnerMonitorMixin(models.AbstractModel):
     _name = 'azk.partner.monitor.mixin'
     _description = 'Azk Partner Monitor Mixin'
@@ -46,3 +60,31 @@ class PartnerMonitorMixin(models.AbstractModel):
                 _logger.error("Unexpected failure in message_post: %s", e)
                 break
         _logger.error("Sending error notification was unsuccessful after two attempts.")
+
+    @contextmanager
+    def _job_lock(self, job_name):
+        """Hold the advisory lock of ``job_name`` during the block; yields whether it was acquired.
+
+        The lock is taken at session level, so it survives the commits of
+        the job and guards it across every worker and node sharing the
+        database. A job whose lock is held elsewhere should give up rather
+        than run a second time.
+        """
+        cr = self.env.cr
+        cr.execute(
+            "SELECT pg_try_advisory_lock(hashtext('azk_odoo_partner_monitor'), hashtext(%s))", [job_name],
+        )
+        acquired = cr.fetchone()[0]
+        if not acquired:
+            _logger.warning("%s is already running elsewhere, skipping this run.", job_name)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                # An aborted transaction refuses the unlock, also when the
+                # job caught the error itself
+                if cr._cnx.info.transaction_status == TRANSACTION_STATUS_INERROR:
+                    cr.rollback()
+                cr.execute(
+                    "SELECT pg_advisory_unlock(hashtext('azk_odoo_partner_monitor'), hashtext(%s))", [job_name],
+                )
@@ -0,0 +1,220 @@
+import logging
+import os
+import time
+from datetime import timedelta
+from itertools import groupby
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+from ..tools import crawl_stats, page_archive
+
+_logger = logging.getLogger(__name__)
+
+# Stored files not referenced by any index row are only removed once they
+# are this old, a crawl may be about to index a file it just wrote.
+ORPHAN_GRACE = timedelta(days=1)
+
+
+class PartnerPageArchive(models.Model):
+    _name = 'azk.partner.page.archive'
+    _description = 'Archived Partner Page'
+    _order = 'fetched_at desc, id desc'
+
+    url = fields.Char(string='URL', required=True, index=True)
+    page_kind = fields.Selection([
+        ('list', 'Partner List'),
+        ('profile', 'Partner Profile'),
+    ], string='Page', required=True, default='list')
+    fetched_at = fields.Datetime(string='Fetched At', required=True, index=True)
+    content_hash = fields.Char(string='Content Hash', required=True, index=True)
+    compression = fields.Selection([
+        ('zstd', 'zstd'),
+        ('gzip', 'gzip'),
+    ], string='Compression', required=True)
+    size = fields.Integer(string='Size (bytes)')
+    stored_size = fields.Integer(string='Stored Size (bytes)',
+                                 help="Compressed size of the body, shared by every fetch of the same content.")
+
+    @api.model
+    def _is_enabled(self):
+        params = self.env['ir.config_parameter'].sudo()
+        return bool(params.get_param('azk_odoo_partner_monitor.page_archive_enabled'))
+
+    @api.model
+    def _get_root(self):
+        return os.path.join(self.env['ir.attachment']._filestore(), 'azk_partner_page_archive')
+
+    @api.model
+    def _prepare_row(self, url, body, page_kind='list'):
+        """Store ``body`` in the archive and return its index row, as expected by :meth:`_store`."""
+        compression = page_archive.get_compression(self.env['ir.config_parameter'].sudo().get_param(
+            'azk_odoo_partner_monitor.page_archive_compression', 'zstd'))
+        digest, stored_size = page_archive.write_body(self._get_root(), body, compression)
+        return {
+            'url': url,
+            'page_kind': page_kind,
+            'fetched_at': fields.Datetime.now(),
+            'content_hash': digest,
+            'compression': compression,
+            'size': len(body),
+            'stored_size': stored_size,
+        }
+
+    @api.model
+    def _store(self, rows, unchanged_urls=(), page_kind='list'):
+        """Index freshly archived pages, and pages the server answered unchanged (304).
+
+        A page answered unchanged is indexed again with the body of its
+        latest archived fetch, copied in one statement.
+        """
+        self.create(rows)
+        if unchanged_urls:
+            self.flush_model()
+            now = fields.Datetime.now()
+            self.env.cr.execute("""
+                INSERT INTO azk_partner_page_archive
+                    (url, page_kind, fetched_at, content_hash, compression, size, stored_size,
+                     create_uid, create_date, write_uid, write_date)
+                SELECT DISTINCT ON (a.url)
+                       a.url, %(page_kind)s, %(now)s, a.content_hash, a.compression, a.size, a.stored_size,
+                       %(uid)s, %(now)s, %(uid)s, %(now)s
+                  FROM azk_partner_page_archive a
+                 WHERE a.url = ANY(%(urls)s)
+              ORDER BY a.url, a.fetched_at DESC, a.id DESC
+            """, {'page_kind': page_kind, 'now': now, 'uid': self.env.uid, 'urls': list(unchanged_urls)})
+        _logger.info("Archived %d pages (%d unchanged)", len(rows) + len(unchanged_urls), len(unchanged_urls))
+
+    @api.model
+    def _evict(self):
+        """Drop index rows past the retention and the stored bodies no row refers to any more.
+
+        Bodies are removed first, based on what was indexed when the
+        eviction started: those orphaned by the rows deleted now go on the
+        next eviction, so a rolled back deletion never loses a body.
+        """
+        params = self.env['ir.config_parameter'].sudo()
+        retention_days = int(params.get_param('azk_odoo_partner_monitor.page_archive_retention_days', '0'))
+        self.flush_model()
+        self.env.cr.execute("SELECT DISTINCT content_hash, compression FROM azk_partner_page_archive")
+        referenced = set(self.env.cr.fetchall())
+        grace = time.time() - ORPHAN_GRACE.total_seconds()
+        removed = 0
+        for digest, compression, path, mtime in page_archive.iter_stored(self._get_root()):
+            if (digest, compression) not in referenced and mtime < grace:
+                os.unlink(path)
+                removed += 1
+
+        expired = 0
+        if retention_days > 0:
+            self.env.cr.execute(
+                "DELETE FROM azk_partner_page_archive WHERE fetched_at < %s",
+                [fields.Datetime.now() - timedelta(days=retention_days)],
+            )
+            expired = self.env.cr.rowcount
+            self.invalidate_model()
+        _logger.info("Page archive: %d index rows expired, %d stored bodies removed", expired, removed)
+        return expired
+
+    @api.model
+    def _replay(self, date_from, date_to):
+        """Parse the pages archived from ``date_from`` to ``date_to`` again and apply them, without HTTP.
+
+        Days are replayed oldest first, each with the latest fetch of every
+        page that day; the history rows they produce are dated at that
+        fetch and every day is committed on its own. Partners end up with
+        the values of the last day replayed, so a backfill should run up to
+        the latest crawl. Progress and changes are recorded on a crawl run.
+        """
+        Partner = self.env['azk.partner.partner']
+        stats = crawl_stats.CrawlStats()
+        run = self.env['azk.partner.crawl.run'].sudo()._start(
+            f"Replay {fields.Date.to_string(date_from)} to {fields.Date.to_string(date_to)}",
+            f"replay:{fields.Date.to_string(date_from)}:{fields.Date.to_string(date_to)}", [], 'replay',
+        )
+        config = self.env['ir.config_parameter'].sudo()
+        chunk_size = int(config.get_param('azk_odoo_partner_monitor.partner_upsert_chunk_size', '0')) or 1000
+        root = self._get_root()
+
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (a.fetched_at::date, a.url)
+                   a.fetched_at::date, a.fetched_at, a.url, a.page_kind, a.content_hash, a.compression
+              FROM azk_partner_page_archive a
+             WHERE a.fetched_at >= %s AND a.fetched_at < %s
+          ORDER BY a.fetched_at::date, a.url, a.fetched_at DESC, a.id DESC
+        """, [date_from, date_to + timedelta(days=1)])
+        missing = 0
+        with run._profile():
+            for day, pages in groupby(self.env.cr.fetchall(), key=lambda row: row[0]):
+                pages = list(pages)
+                day_partner = Partner.with_context(
+                    partner_crawl_stats=stats, tracking_disable=True,
+                    partner_change_date=max(page[1] for page in pages),
+                )
+                buffer, profiles = [], {}
+                for _day, _fetched_at, url, page_kind, digest, compression in pages:
+                    body = page_archive.read_body(root, digest, compression)
+                    if body is None:
+                        missing += 1
+                        continue
+                    with stats.stage('parse'):
+                        if page_kind == 'profile':
+                            profiles[url] = day_partner._parse_partner_profile_page(body)
+                        else:
+                            buffer.extend(day_partner._parse_partner_list(body))
+                    if len(buffer) >= chunk_size:
+                        with stats.stage('upsert', exclude='history'):
+                            day_partner._upsert_partner_records(buffer)
+                        run.records_count += len(buffer)
+                        buffer.clear()
+                with stats.stage('upsert', exclude='history'):
+                    day_partner._upsert_partner_records(buffer)
+                run.records_count += len(buffer)
+                if profiles := {url: data for url, data in profiles.items() if data}:
+                    data_by_partner_id = {
+                        partner.id: profiles[partner.partner_url]
+                        for partner in Partner.search([('partner_url', 'in', list(profiles))])
+                    }
+                    day_partner._apply_profile_values(data_by_partner_id)
+                    run.records_count += len(data_by_partner_id)
+                run._add_stats(stats)
+                self.env.cr.commit()
+                _logger.info("Replayed %d archived pages of %s", len(pages), day)
+        run._add_stats(stats)
+        run._finish()
+        Partner._after_crawl()
+        if missing:
+            _logger.warning("Replay skipped %d archived pages whose body is missing", missing)
+        return run
+
+
+class PartnerPageArchiveReplay(models.TransientModel):
+    _name = 'azk.partner.page.archive.replay'
+    _description = 'Replay Archived Partner Pages'
+
+    date_from = fields.Date(string='From', required=True,
+                            default=lambda self: fields.Date.context_today(self) - timedelta(days=7))
+    date_to = fields.Date(string='To', required=True, default=fields.Date.context_today)
+    page_count = fields.Integer(string='Archived Fetches', compute='_compute_page_count')
+
+    @api.depends('date_from', 'date_to')
+    def _compute_page_count(self):
+        Archive = self.env['azk.partner.page.archive']
+        for wizard in self:
+            wizard.page_count = wizard.date_from and wizard.date_to and Archive.search_count([
+                ('fetched_at', '>=', wizard.date_from),
+                ('fetched_at', '<', wizard.date_to + timedelta(days=1)),
+            ])
+
+    def action_replay(self):
+        self.ensure_one()
+        if self.date_from > self.date_to:
+            raise UserError(_("The start of the replay must precede its end."))
+        run = self.env['azk.partner.page.archive'].sudo()._replay(self.date_from, self.date_to)
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'azk.partner.crawl.run',
+            'res_id': run.id,
+            'view_mode': 'form',
+        }
@@ -0,0 +1,127 @@
+import hashlib
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+
+class PartnerPageCache(models.Model):
+    _name = 'azk.partner.page.cache'
+    _description = 'Partner Crawler Page Cache'
+    _order = 'last_checked desc'
+
+    url = fields.Char(string='URL', required=True, index=True)
+    etag = fields.Char(string='ETag')
+    last_modified = fields.Char(string='Last Modified')
+    content_hash = fields.Char(string='Content Hash')
+    value = fields.Char(string='Cached Value', help="Value derived from the page, e.g. the page count of a listing.")
+    last_checked = fields.Datetime(string='Last Checked', index=True)
+
+    _sql_constraints = [
+        ('url_uniq', 'unique(url)', 'A page can only be cached once.'),
+    ]
+
+    @api.model
+    def _is_enabled(self):
+        params = self.env['ir.config_parameter'].sudo()
+        return bool(params.get_param('azk_odoo_partner_monitor.page_cache_enabled'))
+
+    @api.model
+    def _get_entries(self, urls):
+        """Map each cached URL among ``urls`` to its cache entry."""
+        if not self._is_enabled():
+            return {}
+        return {entry.url: entry for entry in self.search([('url', 'in', list(urls))])}
+
+    def _get_conditional_headers(self):
+        headers = {}
+        if not self:
+            return headers
+        self.ensure_one()
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    @api.model
+    def _prepare_row(self, url, body, etag=None, last_modified=None, value=None):
+        """Cache row for a freshly downloaded page, as expected by :meth:`_store`."""
+        return {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_hash': hashlib.sha256(body).hexdigest(),
+            'value': value,
+        }
+
+    def _is_unchanged(self, status, row=None):
+        """Whether a response proves the cached page unchanged (304 or same content hash)."""
+        if not self:
+            return False
+        return status == 304 or (row is not None and row['content_hash'] == self.content_hash)
+
+    @api.model
+    def _store(self, rows, touched_urls=()):
+        """Insert or refresh cache entries in bulk.
+
+        ``rows`` are dicts with the ``url``, ``etag``, ``last_modified``,
+        ``content_hash`` and optionally ``value`` of freshly downloaded pages;
+        ``touched_urls`` were confirmed unchanged and only get ``last_checked``
+        bumped.
+        """
+        if not self._is_enabled():
+            return
+        now = fields.Datetime.now()
+        uid = self.env.uid
+        # The same URL must not appear twice in one ON CONFLICT statement
+        rows = list({row['url']: row for row in rows}.values())
+        if rows:
+            self.env.cr.execute("""
+                INSERT INTO azk_partner_page_cache AS c
+                    (url, etag, last_modified, content_hash, value, last_checked,
+                     create_uid, create_date, write_uid, write_date)
+                VALUES %s
+                ON CONFLICT (url) DO UPDATE SET
+                    etag = EXCLUDED.etag,
+                    last_modified = EXCLUDED.last_modified,
+                    content_hash = EXCLUDED.content_hash,
+                    value = COALESCE(EXCLUDED.value, c.value),
+                    last_checked = EXCLUDED.last_checked,
+                    write_uid = EXCLUDED.write_uid,
+                    write_date = EXCLUDED.write_date
+            """ % ', '.join(['%s'] * len(rows)), [
+                (row['url'], row.get('etag'), row.get('last_modified'), row.get('content_hash'),
+                 row.get('value'), now, uid, now, uid, now)
+                for row in rows
+            ])
+        if touched_urls:
+            self.env.cr.execute(
+                "UPDATE azk_partner_page_cache SET last_checked = %s WHERE url IN %s",
+                [now, tuple(touched_urls)],
+            )
+        self.invalidate_model()
+
+    @api.model
+    def _evict(self):
+        """Drop entries older than the configured age and trim the cache to its maximum size."""
+        params = self.env['ir.config_parameter'].sudo()
+        max_age = int(params.get_param('azk_odoo_partner_monitor.page_cache_max_age_days', '7'))
+        max_entries = int(params.get_param('azk_odoo_partner_monitor.page_cache_max_entries', '10000'))
+        cr = self.env.cr
+        if max_age > 0:
+            cr.execute(
+                "DELETE FROM azk_partner_page_cache WHERE last_checked < %s",
+                [fields.Datetime.now() - timedelta(days=max_age)],
+            )
+        if max_entries > 0:
+            cr.execute("""
+                DELETE FROM azk_partner_page_cache WHERE id IN (
+                    SELECT id FROM azk_partner_page_cache
+                    ORDER BY last_checked DESC NULLS LAST
+                    OFFSET %s
+                )
+            """, [max_entries])
+        self.invalidate_model()
@@ -1,15 +1,31 @@
+import json
 import logging
-import re
+import psycopg2.errors
 import requests
 import time
 import random
+from collections import defaultdict
 from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from urllib.parse import urlencode
 
 from odoo import models, fields, api
+from odoo.tools import split_every
+from odoo.tools.sql import create_index
+
+from ..tools import async_fetcher, crawl_stats, partner_parser
+from .partner_monitor_mixin import PartnerMonitorMixin, exclusive_job
 
 _logger = logging.getLogger(__name__)
 
+# Seconds the fetch cron waits for the shards held by crawl workers
+SHARD_POLL_SECONDS = 2
+# Conflicts a page may run into before its attempt counts as failed
+SHARD_CONFLICT_RETRIES = 3
+
+# Custom User-Agent to reduce block risk
+USER_AGENT = 'Mozilla/5.0 (compatible; OdooPartnerBot/1.0; +https://yourdomain.example)'
+
 # --- HTTP SESSION WITH FAST RETRIES ---
 def get_retry_session():
     from requests.adapters import HTTPAdapter
@@ -26,27 +42,33 @@ def get_retry_session():
     adapter = HTTPAdapter(max_retries=retry)
     session.mount('http://', adapter)
     session.mount('https://', adapter)
-    # Custom User-Agent to reduce block risk
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (compatible; OdooPartnerBot/1.0; +https://yourdomain.example)'
-    })
+    session.headers.update({'User-Agent': USER_AGENT})
     return session
 
 RETRY_SESSION = get_retry_session()
 
-class PartnerPartner(models.Model):
+# Status ranking used to tell promotions from demotions
+STATUS_ORDER = ['ready', 'silver', 'gold']
+
+PROJECT_SIZE_BUCKETS = ['<5', '5-10', '11-25', '25+']
+
+class PartnerPartner(models.Model, PartnerMonitorMixin):
     _name = 'azk.partner.partner'
     _inherit = ['mail.thread', 'mail.activity.mixin']
     _description = 'Odoo Official Partner'
 
     name = fields.Char(string='Partner Name', required=True, tracking=True)
     partner_url = fields.Char(string='Profile URL')
+    odoo_partner_id = fields.Integer(
+        string='Odoo Partner ID', compute='_compute_odoo_partner_id', store=True, readonly=True,
+        help="Numeric id of the partner on odoo.com, taken from its profile URL. Used as the crawl identity.",
+    )
     current_status = fields.Selection([
         ('gold', 'Gold'),
         ('silver', 'Silver'),
         ('ready', 'Ready'),
     ], string='Status', default='ready', tracking=True)
-    country_id = fields.Many2one('azk.partner.country', string='Country', tracking=True)
+    country_id = fields.Many2one('azk.partner.country', string='Country', tracking=True, index=True)
     first_seen_on = fields.Date(string='First Seen On', default=fields.Date.context_today, readonly=True)
     retention_rate = fields.Float(string='Retention Rate')
     total_references_count = fields.Integer(string='Total References')
@@ -56,6 +78,8 @@ class PartnerPartner(models.Model):
 
     status_history_ids = fields.One2many('azk.partner.status.history', 'partner_id', string='Status History')
     reference_ids = fields.One2many('azk.partner.reference', 'partner_id', string='Reference History')
+    reference_segment_ids = fields.One2many(
+        'azk.partner.reference.segment', 'partner_id', string='Compacted Reference History')
     project_size_bucket = fields.Selection(
         selection=[
             ('<5', '<5'),
@@ -68,6 +92,22 @@ class PartnerPartner(models.Model):
         store=True
     )
 
+    _sql_constraints = [
+        ('odoo_partner_id_uniq', 'unique(odoo_partner_id)', 'A partner with this profile URL already exists.'),
+    ]
+
+    def init(self):
+        # Only a handful of partners are flagged at a time
+        create_index(
+            self.env.cr, 'azk_partner_partner_to_reprocess_references_idx',
+            self._table, ['id'], where='to_reprocess_references',
+        )
+
+    @api.depends('partner_url')
+    def _compute_odoo_partner_id(self):
+        for record in self:
+            record.odoo_partner_id = partner_parser.parse_partner_id(record.partner_url)
+
     @api.depends('average_project_size')
     def _compute_project_size_bucket(self):
         for record in self:
@@ -81,26 +121,125 @@ class PartnerPartner(models.Model):
             else:
                 record.project_size_bucket = '<5'
 
+    @api.model
+    def get_dashboard_version(self):
+        """Token the dashboard validates its cached results against; changes after each crawl."""
+        return self.env['ir.config_parameter'].sudo().get_param('azk_odoo_partner_monitor.dashboard_data_version', '0')
+
+    @api.model
+    def _bump_dashboard_version(self):
+        self.env['ir.config_parameter'].sudo().set_param(
+            'azk_odoo_partner_monitor.dashboard_data_version', fields.Datetime.to_string(fields.Datetime.now()),
+        )
+
+    @api.model
+    def get_dashboard_filter_options(self):
+        """Return the countries and the first-seen years offered by the dashboard filters."""
+        countries = self.env['azk.partner.country'].search_read([], ['id', 'name'], order='name ASC', limit=1000)
+        years = sorted(
+            (first_seen.year for (first_seen,) in self._read_group(
+                [('first_seen_on', '!=', False)], ['first_seen_on:year'], [],
+            ) if first_seen),
+            reverse=True,
+        )
+        return {'countries': countries, 'years': years}
+
+    @api.model
+    def _get_snapshot_domain(self, domain):
+        """Translate a dashboard domain to the snapshot model, or None when it cannot be."""
+        mapping = {'current_status': 'status', 'country_id': 'country_id'}
+        snapshot_domain = []
+        for leaf in domain:
+            if not isinstance(leaf, (list, tuple)) or leaf[0] not in mapping:
+                return None
+            snapshot_domain.append((mapping[leaf[0]], leaf[1], leaf[2]))
+        return snapshot_domain
+
+    @api.model
+    def get_dashboard_data(self, domain=None, limit=5):
+        """Return the dashboard charts data, aggregated in SQL.
+
+        Reads the latest daily snapshot when the filters allow it, otherwise
+        groups the live partners by country, status and project size bucket
+        in one query. The result holds the ``limit`` countries with the most
+        and the fewest partners, so its size does not depend on the number
+        of partners.
+        """
+        domain = domain or []
+        Snapshot = self.env['azk.partner.stat.snapshot']
+        snapshot_domain = self._get_snapshot_domain(domain)
+        latest = snapshot_domain is not None and Snapshot.search([], order='date desc', limit=1).date
+        if latest:
+            bucket_fields = ['bucket_lt_5', 'bucket_5_10', 'bucket_11_25', 'bucket_25_plus']
+            groups = [
+                (country, status, bucket, count)
+                for country, status, *bucket_counts in Snapshot._read_group(
+                    [('date', '=', latest)] + snapshot_domain,
+                    ['country_id', 'status'], [f'{fname}:sum' for fname in bucket_fields],
+                )
+                for bucket, count in zip(PROJECT_SIZE_BUCKETS, bucket_counts)
+            ]
+        else:
+            groups = self._read_group(
+                domain, ['country_id', 'current_status', 'project_size_bucket'], ['__count'],
+            )
+
+        countries = {}
+        for country, status, bucket, count in groups:
+            row = countries.get(country.id)
+            if row is None:
+                row = countries[country.id] = {
+                    'id': country.id or None,
+                    'name': country.name or 'Unknown',
+                    'gold': 0, 'silver': 0, 'ready': 0,
+                    **dict.fromkeys(PROJECT_SIZE_BUCKETS, 0),
+                    'total': 0,
+                }
+            if status:
+                row[status] += count
+            row[bucket or '<5'] += count
+            row['total'] += count
+
+        # Countries without partners left in the filtered snapshot are dropped
+        ranked = sorted((row for row in countries.values() if row['total']), key=lambda row: row['total'], reverse=True)
+        return {
+            'top': ranked[:limit],
+            'bottom': ranked[-limit:],
+        }
+
     @api.model_create_multi
     def create(self, vals_list):
+        first_seen_on = fields.Date.context_today(self, self._get_change_datetime())
         for vals in vals_list:
-            vals.setdefault('first_seen_on', fields.Date.context_today(self))
+            vals.setdefault('first_seen_on', first_seen_on)
         return super().create(vals_list)
 
-    def write(self, vals):
-        today = fields.Date.context_today(self)
+    @api.model
+    def _get_change_datetime(self):
+        """When history rows are dated: now, or the fetch time of the archived pages being replayed."""
+        return self.env.context.get('partner_change_date') or fields.Datetime.now()
+
+    def _prepare_history_vals(self, vals):
+        """Diff the whole recordset against ``vals`` in one pass.
+
+        Returns the status-history and reference-history rows the write
+        produces, so each kind can be inserted with a single create.
+        """
+        status_vals, reference_vals = [], []
+        now = self._get_change_datetime()
+        today = fields.Date.context_today(self, now)
+        new_status = vals.get('current_status')
+        new_count = vals.get('total_references_count')
         for partner in self:
             # Track status changes
-            if 'current_status' in vals and vals['current_status'] != partner.current_status:
+            if 'current_status' in vals and new_status != partner.current_status:
                 old_status = partner.current_status
-                new_status = vals['current_status']
                 change_type = (
                     'initial' if not old_status else
-                    'promoted' if ['ready', 'silver', 'gold'].index(new_status) >
-                                   ['ready', 'silver', 'gold'].index(old_status)
+                    'promoted' if STATUS_ORDER.index(new_status) > STATUS_ORDER.index(old_status)
                     else 'demoted'
                 )
-                self.env['azk.partner.status.history'].create({
+                status_vals.append({
                     'partner_id': partner.id,
                     'old_status': old_status,
                     'new_status': new_status,
@@ -109,299 +248,812 @@ class PartnerPartner(models.Model):
                 })
 
             # Track reference count changes
-            if 'total_references_count' in vals and vals['total_references_count'] != partner.total_references_count:
-                self.env['azk.partner.reference'].create({
+            if 'total_references_count' in vals and new_count != partner.total_references_count:
+                reference_vals.append({
                     'partner_id': partner.id,
-                    'reference_count': str(vals['total_references_count']),
+                    'reference_count': new_count,
                     'old_reference_count': partner.total_references_count,
                     'active': True,
-                    'change_date': fields.Datetime.now(),
+                    'change_date': now,
                 })
+        return status_vals, reference_vals
 
+    def write(self, vals):
+        stats = self._get_crawl_stats()
+        with stats.stage('history'):
+            status_vals, reference_vals = self._prepare_history_vals(vals)
+            if status_vals:
+                self.env['azk.partner.status.history'].create(status_vals)
+            if reference_vals:
+                self.env['azk.partner.reference'].create(reference_vals)
+        stats.count('history_rows', len(status_vals) + len(reference_vals))
+        if self.env.context.get('partner_crawl_stats'):
+            self._note_digest(stats, status_vals, reference_vals)
         return super().write(vals)
 
+    def _note_digest(self, stats, status_vals, reference_vals):
+        """Add the history rows of a crawl write to the run digest."""
+        names = {partner.id: partner.name for partner in self}
+        for vals in status_vals:
+            stats.note(vals['change_type'], "%s (%s → %s)" % (
+                names[vals['partner_id']], vals['old_status'] or '-', vals['new_status']))
+        for vals in reference_vals:
+            old, new = vals['old_reference_count'] or 0, vals['reference_count'] or 0
+            stats.note('references', "%s: %s → %s" % (names[vals['partner_id']], old, new), new - old)
+
+    def _get_crawl_stats(self):
+        """Return the ``CrawlStats`` of the crawl in progress, or a throwaway one outside of crawls."""
+        return self.env.context.get('partner_crawl_stats') or crawl_stats.CrawlStats()
+
     def _get_country_slug_and_id(self, country_name):
-        url = 'https://www.odoo.com/partners'
-        try:
-            time.sleep(random.uniform(0.1, 0.5))  # Speed: minimal delay
-            resp = RETRY_SESSION.get(url, timeout=20)
-            resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            for a in soup.select('a[href*="/partners/country/"]'):
-                if a.get_text(strip=True).lower() == country_name.lower():
-                    match = re.search(r'/country/([a-z0-9\-]+)-(\d+)', a['href'])
-                    if match:
-                        return match.group(1), match.group(2)
-        except Exception as e:
-            _logger.error("Failed to fetch country slug/id for %s: %s", country_name, e)
-        return None, None
+        return self.env['azk.partner.country'].sudo()._get_slug_and_odoo_id(country_name)
 
     def _get_max_pages(self, base_url):
+        cache = self.env['azk.partner.page.cache'].sudo()
+        # Keyed apart from the page-1 entry of the crawl, which shares the URL
+        cache_key = f"{base_url}#pagination"
+        entry = cache._get_entries([cache_key]).get(cache_key, cache)
         try:
             time.sleep(random.uniform(0.1, 0.5))  # Speed: minimal delay
-            resp = RETRY_SESSION.get(base_url, timeout=20)
+            resp = RETRY_SESSION.get(base_url, headers=entry._get_conditional_headers(), timeout=20)
             resp.raise_for_status()
+            row = cache._prepare_row(cache_key, resp.content, resp.headers.get('ETag'), resp.headers.get('Last-Modified'))
+            if entry.value and entry._is_unchanged(resp.status_code, row):
+                cache._store([], [cache_key])
+                return int(entry.value)
             soup = BeautifulSoup(resp.text, 'html.parser')
             pages = [int(a.text.strip()) for a in soup.select('ul.pagination li a') if a.text.strip().isdigit()]
-            return max(pages) if pages else 1
+            max_pages = max(pages) if pages else 1
+            cache._store([dict(row, value=str(max_pages))])
+            return max_pages
         except Exception as e:
             _logger.error("Pagination detection failed: %s", e)
             return 1
 
+    @api.model
+    def _get_directory_url(self):
+        """Root URL of the partner directory, odoo.com unless pointed at a stand-in server."""
+        url = self.env['ir.config_parameter'].sudo().get_param(
+            'azk_odoo_partner_monitor.partner_directory_url', partner_parser.DEFAULT_DIRECTORY_URL)
+        return (url or partner_parser.DEFAULT_DIRECTORY_URL).rstrip('/')
+
     def _parse_partner_card(self, soup_item):
-        try:
-            name = soup_item.select_one('h5 span').text.strip()
-            profile_url = f"https://www.odoo.com{soup_item.get('href')}"
-            badge = soup_item.select_one('h5 .badge')
-            status = 'gold' if badge and 'gold' in badge.text.lower() else \
-                     'silver' if badge and 'silver' in badge.text.lower() else 'ready'
-            country = soup_item.select_one('#o_wcrm_partners_address span')
-            country_name = country.text.strip() if country else 'Unknown'
-            retention_span = soup_item.select_one('div.mb-2 small span')
-            retention = float(retention_span.text.strip()) if retention_span else 0.0
-            ref_div = soup_item.select_one('div.col-md-3.stat_ref > div')
-            ref_count = int(re.search(r'(\d+)', ref_div.text.strip()).group(1)) if ref_div else 0
-
-            largest, average = 0, 0.0
-            for tag in soup_item.select('small.text-muted'):
-                text = tag.text.strip()
-                if text.startswith('Average Project'):
-                    match = re.search(r'(\d+(?:\.\d+)?)', text)
-                    average = float(match.group(1)) if match else 0.0
-                elif text.startswith('Large Project'):
-                    match = re.search(r'(\d+)', text)
-                    largest = int(match.group(1)) if match else 0
-
-            return (name, {
-                'partner_url': profile_url,
-                'current_status': status,
-                'country_name': country_name,
-                'retention_rate': retention,
-                'total_references_count': ref_count,
-                'largest_project_size': largest,
-                'average_project_size': average,
-            })
-        except Exception as e:
-            _logger.warning("Failed to parse partner item: %s", e)
-            return None
+        return partner_parser.parse_partner_card(soup_item, self._get_directory_url())
 
-    def _scrape_page(self, url):
+    def _get_parser_backend(self):
+        backend = self.env['ir.config_parameter'].sudo().get_param(
+            'azk_odoo_partner_monitor.partner_parser_backend', 'bs4')
+        return backend if backend in partner_parser.BACKENDS else 'bs4'
+
+    def _parse_partner_list(self, html):
+        return partner_parser.parse_partner_list(html, self._get_parser_backend(), self._get_directory_url())
+
+    def _fetch_page(self, url, headers=None):
+        """Download ``url`` and return a ``FetchResult``."""
+        time.sleep(random.uniform(0.1, 0.5))  # Speed: minimal delay
+        start = time.perf_counter()
         try:
-            time.sleep(random.uniform(0.1, 0.5))  # Speed: minimal delay
-            resp = RETRY_SESSION.get(url, timeout=20)
+            resp = RETRY_SESSION.get(url, headers=headers, timeout=20)
+            # Attempts retried by the session adapter
+            history = getattr(getattr(resp.raw, 'retries', None), 'history', ())
             resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            return [
-                parsed for card in soup.select('a.text-decoration-none.row.p-2.text-black')
-                if (parsed := self._parse_partner_card(card))
-            ]
+            return async_fetcher.FetchResult(
+                url, resp.status_code, resp.content, None,
+                resp.headers.get('ETag'), resp.headers.get('Last-Modified'),
+                time.perf_counter() - start, len(history),
+                sum(1 for attempt in history if attempt.status in async_fetcher.THROTTLE_STATUSES),
+            )
         except Exception as e:
             _logger.error("Error scraping %s: %s", url, e)
-            return []
+            return async_fetcher.FetchResult(url, None, None, str(e), None, None, time.perf_counter() - start)
 
-    def _determine_pages(self, mode, config):
-        base_url = 'https://www.odoo.com/partners?country_all=1'
+    def _scrape_page(self, url):
+        result = self._fetch_page(url)
+        return self._parse_partner_list(result.body) if not result.error else []
+
+    def _determine_pages(self, mode, page=None, country_name=None):
+        directory_url = self._get_directory_url()
+        base_url = f'{directory_url}/partners?country_all=1'
         if mode == 'all':
             return base_url, list(range(1, self._get_max_pages(base_url) + 1))
         if mode == 'first':
             return base_url, [1]
         if mode == 'specific':
-            page = int(config.get_param('azk_odoo_partner_monitor.partner_fetch_page', '1'))
-            return base_url, [page]
+            return base_url, [page or 1]
         if mode == 'specific_c':
-            country_id = config.get_param('azk_odoo_partner_monitor.partner_country_id')
-            country = self.env['res.country'].browse(int(country_id)) if country_id else None
-            if not country.exists():
-                _logger.error("Invalid country ID: %s", country_id)
+            if not country_name:
+                _logger.error("No country given for the specific country mode")
                 return base_url, []
-            slug, num_id = self._get_country_slug_and_id(country.name)
+            slug, num_id = self._get_country_slug_and_id(country_name)
             if not slug:
-                _logger.error("No slug found for %s", country.name)
+                _logger.error("No slug found for %s", country_name)
                 return base_url, []
-            country_url = f"https://www.odoo.com/partners/country/{slug}-{num_id}"
+            country_url = f"{directory_url}/partners/country/{slug}-{num_id}"
             return country_url, list(range(1, self._get_max_pages(country_url) + 1))
         _logger.error("Unknown fetch mode: %s", mode)
         return base_url, []
 
-    def fetch_partner_data(self):
+    def _get_run_key(self, mode, page=None, country_name=None):
+        """Identify the crawl target, so an interrupted run can be resumed by the next one."""
+        if mode == 'specific':
+            return f"{mode}:{page or 1}"
+        if mode == 'specific_c':
+            return f"{mode}:{country_name}"
+        return mode
+
+    def fetch_partner_data(self, mode=None, page=None, country_name=None, run_type='fetch'):
+        """Crawl the partner directory and save the scraped partners.
+
+        Without arguments the target comes from the module settings (this is
+        what the daily cron does); ``mode``, ``page`` and ``country_name``
+        let callers crawl a given target without touching the settings.
+        Stage timings and counters are recorded on the crawl run. Returns
+        whether the crawl ran: it does not when the target has no pages or
+        is being crawled elsewhere.
+        """
         config = self.env['ir.config_parameter'].sudo()
-        fetch_mode = config.get_param('azk_odoo_partner_monitor.partner_fetch_mode', 'all')
+        if mode is None:
+            mode = config.get_param('azk_odoo_partner_monitor.partner_fetch_mode', 'all')
+            if mode == 'specific':
+                page = int(config.get_param('azk_odoo_partner_monitor.partner_fetch_page', '1'))
+            elif mode == 'specific_c':
+                country_id = config.get_param('azk_odoo_partner_monitor.partner_country_id')
+                country = self.env['res.country'].browse(int(country_id)) if country_id else None
+                if not country or not country.exists():
+                    _logger.error("Invalid country ID: %s", country_id)
+                    return False
+                country_name = country.name
 
-        base_url, pages = self._determine_pages(fetch_mode, config)
-        if not pages:
-            _logger.warning("No pages to fetch.")
-            return
+        run_key = self._get_run_key(mode, page, country_name)
+        # Overlapping runs of one target would crawl it twice
+        with self._job_lock(f'fetch:{run_key}') as acquired:
+            if not acquired:
+                return False
+            stats = crawl_stats.CrawlStats()
+            Run = self.env['azk.partner.crawl.run'].sudo()
+            run = Run._get_resumable(run_key)
+            if run:
+                run.resume_count += 1
+                _logger.info("Resuming crawl run %s", run.name)
+            else:
+                with stats.stage('discovery'):
+                    base_url, pages = self._determine_pages(mode, page, country_name)
+                if not pages:
+                    _logger.warning("No pages to fetch.")
+                    return False
+
+                use_amp = '?' in base_url
+                url_for = lambda p: f"{base_url}/page/{p}" if not use_amp else f"{base_url}&page={p}" if p > 1 else base_url
+
+                run = Run._start(
+                    f"Fetch {run_key} {fields.Datetime.to_string(fields.Datetime.now())}",
+                    run_key, [url_for(p) for p in pages], run_type,
+                )
+            if run.shard_size:
+                Run._trigger_shard_workers()
+            # Persist the checkpoint so a run cut short by the cron time limit can be resumed
+            self.env.cr.commit()
+
+            chunk_size = int(config.get_param('azk_odoo_partner_monitor.partner_upsert_chunk_size', '0'))
+            # Crawl writes skip the chatter tracking, the run posts one digest instead
+            with run._profile():
+                self.with_context(partner_crawl_stats=stats, tracking_disable=True)._crawl_run(run, chunk_size)
+            # Concurrent country crawls would contend on the snapshot rows and
+            # the version parameter, their cron refreshes them once at the end
+            if run_type != 'country':
+                self._after_crawl()
+        return True
+
+    @api.model
+    def _after_crawl(self):
+        """Refresh today's statistics snapshot and invalidate the dashboard caches."""
+        self.env['azk.partner.stat.snapshot'].sudo()._capture_snapshot()
+        self._bump_dashboard_version()
+
+    def _crawl_run(self, run, chunk_size):
+        """Crawl the remaining pages of ``run``, retrying failed pages within their budget.
+
+        With a ``chunk_size``, records are upserted and committed in chunks
+        as pages arrive, together with the checkpoint of the pages they came
+        from: memory stays flat and the work done before a timeout or crash
+        is kept. Without it, everything is saved in one transaction.
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        retry_budget = int(config.get_param('azk_odoo_partner_monitor.partner_crawl_page_retries', '3'))
+        cache_batch = {'rows': [], 'unchanged': []}
+        if run.shard_size:
+            # Shards store their page cache rows as they are committed
+            self._crawl_shards(run, retry_budget)
+        else:
+            while pages := run._get_pages_to_crawl(retry_budget):
+                batch = self._crawl_checkpointed(run, pages.mapped('url'), chunk_size)
+                cache_batch['rows'] += batch['rows']
+                cache_batch['unchanged'] += batch['unchanged']
+
+        self._store_page_cache(cache_batch)
+        run._merge_shards()
+        run._add_stats(self._get_crawl_stats())
+        run._finish()
+        _logger.info(
+            "Scraped %d partner records (%d pages failed) in %.1fs: discovery %.1fs, HTTP wait %.1fs, "
+            "parsing %.1fs, upsert %.1fs, history %.1fs",
+            run.records_count, run.pages_failed, run.duration, run.discovery_time, run.http_wait_time,
+            run.parse_time, run.upsert_time, run.history_time,
+        )
+
+    def _crawl_checkpointed(self, run, urls, chunk_size, recorder=None):
+        """Crawl ``urls`` of ``run``; records and stats go to ``recorder``, the run itself by default."""
+        buffer, done_urls, failed_urls = [], [], []
+        stats = self._get_crawl_stats()
+        recorder = recorder or run
+
+        def flush():
+            with stats.stage('upsert', exclude='history'):
+                self._upsert_partner_records(buffer)
+            run._mark_pages(done_urls, failed_urls)
+            recorder.records_count += len(buffer)
+            recorder._add_stats(stats)
+            if chunk_size:
+                self.env.cr.commit()
+            buffer.clear()
+            done_urls.clear()
+            failed_urls.clear()
+
+        def on_page(url, records):
+            if records is None:
+                failed_urls.append(url)
+            else:
+                buffer.extend(records)
+                done_urls.append(url)
+            if chunk_size and len(buffer) >= chunk_size:
+                flush()
+
+        cache_batch = self._crawl_pages(urls, on_page)
+        flush()
+        return cache_batch
+
+    def _crawl_shards(self, run, retry_budget, worker=False):
+        """Claim shards of ``run`` and crawl them, each in its own transaction; returns the number crawled.
+
+        Any number of workers may crawl the same run: each claims the next
+        ``shard_size`` pages nobody holds. A shard is saved and checkpointed
+        in one commit, which also releases its claim, so a worker that dies
+        gives its shard back. Workers record their counters on a shard row
+        and return once nothing is left to claim; the coordinator (the fetch
+        cron, ``worker`` False) records on the run and waits for the shards
+        of the other workers before returning, retrying those they failed.
+        A shard that keeps conflicting with concurrent ones has its pages
+        marked failed after :data:`SHARD_CONFLICT_RETRIES` tries, so they
+        use up the retry budget like pages that could not be fetched.
+        """
+        Shard = self.env['azk.partner.crawl.shard'].sudo()
+        cache = self.env['azk.partner.page.cache'].sudo()
+        conflicts = defaultdict(int)
+        shards = 0
+        while True:
+            pages = run._claim_pages(retry_budget)
+            if not pages:
+                if worker or not run._get_pages_to_crawl(retry_budget):
+                    break
+                # The remaining pages are held by other workers
+                self.env.cr.commit()
+                time.sleep(SHARD_POLL_SECONDS)
+                continue
+            urls = pages.mapped('url')
+            recorder = Shard.create({'run_id': run.id, 'page_count': len(pages)}) if worker else run
+            try:
+                batch = self._crawl_checkpointed(run, urls, 0, recorder)
+                cache._store(batch['rows'], batch['unchanged'])
+                self.env.cr.commit()
+            except (psycopg2.errors.SerializationFailure, psycopg2.errors.UniqueViolation) as e:
+                # Another shard updated or created the same partners (the
+                # directory paging shifts during a crawl), the pages are
+                # claimed again and the partner is then found. The rollback
+                # also drops the attempt, which is counted here instead.
+                self.env.cr.rollback()
+                for url in urls:
+                    conflicts[url] += 1
+                exhausted = [url for url in urls if conflicts[url] >= SHARD_CONFLICT_RETRIES]
+                if not exhausted:
+                    _logger.warning("Shard of %s conflicted with a concurrent one, retrying it", run.name)
+                    continue
+                _logger.error("Shard of %s failed %d times, marking its pages failed: %s",
+                              run.name, SHARD_CONFLICT_RETRIES, e)
+                run._mark_pages([], exhausted)
+                self.env.cr.commit()
+                for url in exhausted:
+                    del conflicts[url]
+                continue
+            shards += 1
+        return shards
+
+    def _crawl_pages(self, urls, on_page):
+        """Fetch and parse ``urls`` with the configured fetch engine.
 
-        use_amp = '?' in base_url
-        url_for = lambda p: f"{base_url}/page/{p}" if not use_amp else f"{base_url}&page={p}" if p > 1 else base_url
+        ``on_page(url, records)`` is called from the current thread as each
+        page completes, so callers may safely use the ORM in it. ``records``
+        is None for pages that could not be fetched and empty for pages the
+        page cache proved unchanged. When ``partner_parse_workers`` is set,
+        parsing runs in a process pool so it no longer competes with the
+        network threads for the GIL.
 
-        thread_count = min(len(pages), 12)  # SPEED: up to 12 threads
-        _logger.info("Fetching %d pages using %d threads...", len(pages), thread_count)
+        Returns the page cache batch to hand to :meth:`_store_page_cache`
+        once the records are saved.
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        workers = int(config.get_param('azk_odoo_partner_monitor.partner_parse_workers', '0'))
+        parse_pool = partner_parser.ParsePool(
+            workers, self._get_parser_backend(), self._get_directory_url()) if workers > 0 else None
+        if parse_pool:
+            _logger.info("Parsing pages in %d worker processes", workers)
+
+        # Pages that yielded nothing are kept out of the cache so they get
+        # parsed again next time, e.g. after a markup change is fixed.
+        unparsed = set()
+        stats = self._get_crawl_stats()
+
+        def on_parsed(url, records):
+            if not records:
+                unparsed.add(url)
+            on_page(url, records)
+
+        def on_result(result):
+            if result.error:
+                on_page(result.url, None)
+            elif result.status == 304:
+                on_page(result.url, [])
+            elif parse_pool:
+                parse_pool.submit(result.url, result.body)
+            else:
+                with stats.stage('parse'):
+                    records = self._parse_partner_list(result.body)
+                on_parsed(result.url, records)
+            if parse_pool:
+                for url_records in parse_pool.results():
+                    on_parsed(*url_records)
 
-        scraped = []
-        with ThreadPoolExecutor(max_workers=thread_count) as pool:
-            futures = [pool.submit(self._scrape_page, url_for(p)) for p in pages]
-            for future in as_completed(futures):
-                scraped.extend(future.result() or [])
+        try:
+            cache_batch = self._fetch_pages(urls, on_result)
+            if parse_pool:
+                for url_records in parse_pool.results(block=True):
+                    on_parsed(*url_records)
+        finally:
+            if parse_pool:
+                stats.add_time('parse', parse_pool.parse_time)
+                parse_pool.close()
+        cache_batch['rows'] = [row for row in cache_batch['rows'] if row['url'] not in unparsed]
+        return cache_batch
+
+    def _fetch_pages(self, urls, on_result, page_kind='list'):
+        """Download ``urls`` with the configured fetch engine.
+
+        ``on_result(FetchResult)`` is called from the current thread for each
+        page. Cached pages are requested with conditional headers; pages that
+        come back with a 304 or with the content hash already on record are
+        reported with status 304 and no body. When the page archive is
+        enabled, every fetched page is archived as a ``page_kind`` page.
+        """
+        cache_batch = {'rows': [], 'unchanged': []}
+        if not urls:
+            return cache_batch
+        config = self.env['ir.config_parameter'].sudo()
+        cache = self.env['azk.partner.page.cache'].sudo()
+        entries = cache._get_entries(urls)
+        request_headers = {url: entry._get_conditional_headers() for url, entry in entries.items()}
+        hits = 0
+        stats = self._get_crawl_stats()
+        archive = self.env['azk.partner.page.archive'].sudo()
+        archive_batch = {'rows': [], 'unchanged': []} if archive._is_enabled() else None
 
-        _logger.info("Scraped %d partner records", len(scraped))
-        self._upsert_partner_records(scraped)
+        def on_fetched(result):
+            nonlocal hits
+            stats.count_fetch(result)
+            if archive_batch is not None and not result.error:
+                if result.status == 304:
+                    archive_batch['unchanged'].append(result.url)
+                else:
+                    archive_batch['rows'].append(archive._prepare_row(result.url, result.body, page_kind))
+            if not result.error:
+                entry = entries.get(result.url, cache)
+                row = None
+                if result.status != 304:
+                    row = cache._prepare_row(result.url, result.body, result.etag, result.last_modified)
+                    cache_batch['rows'].append(row)
+                if entry._is_unchanged(result.status, row):
+                    if row is None:
+                        cache_batch['unchanged'].append(result.url)
+                    hits += 1
+                    result = result._replace(status=304, body=None)
+            on_result(result)
+
+        engine = config.get_param('azk_odoo_partner_monitor.partner_fetch_engine', 'threads')
+        if engine == 'async' and async_fetcher.aiohttp is None:
+            _logger.warning("aiohttp is not installed, falling back to the threaded fetch engine.")
+            engine = 'threads'
+        if engine == 'async':
+            self._fetch_pages_async(urls, on_fetched, request_headers, config)
+        else:
+            thread_count = min(len(urls), 12)  # SPEED: up to 12 threads
+            _logger.info("Fetching %d pages using %d threads...", len(urls), thread_count)
+            with ThreadPoolExecutor(max_workers=thread_count) as pool:
+                # Bounded window of pages in flight, so fetched bodies never
+                # pile up faster than they are consumed.
+                pending = set()
+                for url in urls:
+                    if len(pending) >= 2 * thread_count:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            on_fetched(future.result())
+                    pending.add(pool.submit(self._fetch_page, url, request_headers.get(url)))
+                for future in as_completed(pending):
+                    on_fetched(future.result())
+
+        stats.count('cache_hits', hits)
+        if archive_batch is not None:
+            archive._store(archive_batch['rows'], archive_batch['unchanged'], page_kind)
+        if entries:
+            _logger.info("Page cache: %d of %d pages unchanged (%.0f%% hit rate)",
+                         hits, len(urls), 100.0 * hits / len(urls))
+        return cache_batch
+
+    def _fetch_pages_async(self, urls, on_result, request_headers, config):
+        max_concurrency = int(config.get_param('azk_odoo_partner_monitor.partner_fetch_max_concurrency', '32'))
+        _logger.info("Fetching %d pages asynchronously (up to %d concurrent requests)...", len(urls), max_concurrency)
+
+        def on_fetched(result):
+            if result.error:
+                _logger.error("Error scraping %s: %s", result.url, result.error)
+            on_result(result)
+
+        async_fetcher.fetch_pages(
+            urls, on_fetched,
+            max_connections=max_concurrency,
+            max_concurrency=max_concurrency,
+            timeout=20,
+            headers={'User-Agent': USER_AGENT},
+            request_headers=request_headers,
+        )
+
+    def _store_page_cache(self, cache_batch):
+        """Record the validators of pages whose data has been saved, then evict stale entries."""
+        cache = self.env['azk.partner.page.cache'].sudo()
+        cache._store(cache_batch['rows'], cache_batch['unchanged'])
+        cache._evict()
+
+    def _get_changed_values(self, vals):
+        """Return the subset of ``vals`` that differs from what is stored."""
+        self.ensure_one()
+        changed = {}
+        for fname, value in vals.items():
+            current = self[fname]
+            if self._fields[fname].type == 'many2one':
+                current = current.id
+            if current != value:
+                changed[fname] = value
+        return changed
+
+    def _write_grouped(self, values_by_id):
+        """Write ``{partner_id: vals}`` with one write per distinct ``vals``; returns the number of writes."""
+        groups = defaultdict(list)
+        for partner_id, vals in values_by_id.items():
+            groups[tuple(sorted(vals.items()))].append(partner_id)
+        for vals, partner_ids in groups.items():
+            self.browse(partner_ids).write(dict(vals))
+        return len(groups)
 
     def _upsert_partner_records(self, records):
-        country_model = self.env['azk.partner.country'].sudo()
+        if not records:
+            return
         reference_model = self.env['azk.partner.reference'].sudo()
 
-        existing = {
-            p.name: p for p in self.search([('name', 'in', [r[0] for r in records])])
-        }
-
+        # Partners are identified by the numeric id of their profile URL, so
+        # renamed partners are updated in place and namesakes stay apart.
+        # Last occurrence wins when a partner shows up on several pages.
+        scraped, scraped_by_name = {}, {}
         for name, data in records:
+            data = dict(data, name=name)
+            odoo_partner_id = partner_parser.parse_partner_id(data.get('partner_url'))
+            if odoo_partner_id:
+                scraped[odoo_partner_id] = data
+            else:
+                scraped_by_name[name] = data
+        country_ids = self.env['azk.partner.country'].sudo()._get_or_create_by_names({
+            data['country_name']
+            for data in (*scraped.values(), *scraped_by_name.values()) if data.get('country_name')
+        })
+        for data in (*scraped.values(), *scraped_by_name.values()):
             country_name = data.pop('country_name', None)
             if country_name:
-                country = country_model.search([('name', '=', country_name)], limit=1)
-                if not country:
-                    country = country_model.create({'name': country_name})
-                data['country_id'] = country.id
-
-            if name in existing:
-                partner = existing[name]
-                old_count = partner.total_references_count
-                partner.write(data)
-                new_count = data.get('total_references_count')
-
-                # Reference history if updated
-                if new_count is not None and new_count != old_count:
-                    reference_model.create({
-                        'partner_id': partner.id,
-                        'reference_count': str(new_count),
-                        'active': True,
-                        'change_date': fields.Datetime.now(),
-                    })
-            else:
-                partner = self.create([{'name': name, **data}])[0]
-                reference_model.create({
+                data['country_id'] = country_ids[country_name]
+
+        existing = {
+            p.odoo_partner_id: p
+            for p in self.search([('odoo_partner_id', 'in', list(scraped))])
+        }
+        # Records without a usable profile URL fall back to a name lookup
+        existing_by_name = scraped_by_name and {
+            p.name: p
+            for p in self.search([('odoo_partner_id', '=', False), ('name', 'in', list(scraped_by_name))])
+        }
+        matches = [(existing.get(key), data) for key, data in scraped.items()]
+        matches += [(existing_by_name.get(name), data) for name, data in scraped_by_name.items()]
+
+        # Existing partners: only changed values are written.
+        # Status and reference history is captured by write() itself.
+        changes_by_id = {}
+        for partner, data in matches:
+            if partner and (changes := partner._get_changed_values(data)):
+                changes_by_id[partner.id] = changes
+        write_count = self._write_grouped(changes_by_id)
+        updated = len(changes_by_id)
+        matched = len(existing) + len(existing_by_name)
+
+        # New partners: one multi-create plus their initial reference rows
+        new_partners = self.create([data for partner, data in matches if not partner])
+        stats = self._get_crawl_stats()
+        if new_partners:
+            now = self._get_change_datetime()
+            with stats.stage('history'):
+                reference_model.create([{
                     'partner_id': partner.id,
-                    'reference_count':str(partner.total_references_count or 0),
-                    'old_reference_count': str(partner.total_references_count or 0),
+                    'reference_count': partner.total_references_count or 0,
+                    'old_reference_count': partner.total_references_count or 0,
                     'active': True,
-                    'change_date': fields.Datetime.now(),
-                })
+                    'change_date': now,
+                } for partner in new_partners])
+            stats.count('history_rows', len(new_partners))
+            for partner in new_partners:
+                stats.note('created', partner.name)
+        stats.count('partners_created', len(new_partners))
+        stats.count('partners_updated', updated)
+        stats.count('partners_unchanged', matched - updated)
+
+        _logger.info(
+            "Upserted partners: %d created, %d updated in %d writes, %d unchanged",
+            len(new_partners), updated, write_count, matched - updated,
+        )
 
     @api.model
+    @exclusive_job
     def cron_validate_partners(self):
-        Ref = self.env['azk.partner.reference']
-        for partner in self.search([]):
-            last_active_ref = Ref.search([
-                ('partner_id', '=', partner.id),
-                ('active', '=', True)
-            ], order="change_date desc", limit=1)
-
-            if not last_active_ref:
-                continue
+        """Flag partners whose latest active reference row disagrees with their total.
 
-            reference_value = int(last_active_ref.old_reference_count or 0)
-            print('reference_value',reference_value)
-            print('partner.total_references_count',partner.total_references_count)
-            if reference_value != partner.total_references_count:
-                partner.write({'to_reprocess_references': True})
-                _logger.info(
-                    "Partner %s marked for reprocess: reference_count=%s vs total=%s",
-                    partner.name, reference_value, partner.total_references_count
-                )
+        The latest active reference of every partner is picked in a single
+        DISTINCT ON query and compared in SQL, then all mismatching partners
+        are flagged with one write.
+        """
+        self.flush_model(['total_references_count'])
+        self.env['azk.partner.reference'].flush_model(['partner_id', 'old_reference_count', 'active', 'change_date'])
+        self.env.cr.execute("""
+            SELECT p.id, p.name, lr.reference_value, p.total_references_count
+            FROM azk_partner_partner p
+            JOIN (
+                SELECT DISTINCT ON (r.partner_id)
+                       r.partner_id,
+                       COALESCE(r.old_reference_count, 0) AS reference_value
+                FROM azk_partner_reference r
+                WHERE r.active
+                ORDER BY r.partner_id, r.change_date DESC NULLS LAST, r.id DESC
+            ) lr ON lr.partner_id = p.id
+            WHERE lr.reference_value != COALESCE(p.total_references_count, 0)
+        """)
+        mismatches = self.env.cr.fetchall()
+        if not mismatches:
+            return
+
+        self.browse([row[0] for row in mismatches]).write({'to_reprocess_references': True})
+        for _id, name, reference_value, total in mismatches:
+            _logger.debug(
+                "Partner %s marked for reprocess: reference_count=%s vs total=%s",
+                name, reference_value, total
+            )
+        _logger.info("%d partners marked for reference reprocessing", len(mismatches))
 
     def _parse_single_partner_page(self, soup):
-        try:
-            country_name = "Unknown"
-            address_span = soup.select_one('span[itemprop="streetAddress"]')
-            if address_span:
-                parts = re.split(r'<br\s*/?>', str(address_span), flags=re.IGNORECASE)
-                if parts:
-                    last_part = BeautifulSoup(parts[-1], 'html.parser').get_text(strip=True)
-                    if last_part:
-                        country_name = last_part
-
-            retention_rate = 0.0
-            stat_size_div = soup.select_one('div.stat_size')
-            if stat_size_div:
-                retention_span = stat_size_div.find(string=re.compile(r'\d+\s*%'))
-                if retention_span:
-                    match = re.search(r'(\d+)', retention_span)
-                    if match:
-                        retention_rate = float(match.group(1))
-
-            largest_project_size = 0
-            average_project_size = 0.0
-            if stat_size_div:
-                largest_tag = stat_size_div.find('span', string=re.compile('Largest', re.IGNORECASE))
-                if largest_tag and largest_tag.next_sibling:
-                    largest_text = largest_tag.next_sibling.strip()
-                    match = re.search(r'(\d+)', largest_text)
-                    if match:
-                        largest_project_size = int(match.group(1))
-
-                average_tag = stat_size_div.find('span', string=re.compile('Average', re.IGNORECASE))
-                if average_tag and average_tag.next_sibling:
-                    average_text = average_tag.next_sibling.strip()
-                    match = re.search(r'(\d+(?:\.\d+)?)', average_text)
-                    if match:
-                        average_project_size = float(match.group(1))
-
-            total_references_count = 0
-            stat_ref_div = soup.select_one('div.stat_ref')
-            if stat_ref_div:
-                heading = stat_ref_div.find(string=re.compile(r'References\s*-\s*\d+', re.IGNORECASE))
-                if heading:
-                    match = re.search(r'(\d+)', heading)
-                    if match:
-                        total_references_count = int(match.group(1))
-
-            return {
-                'country_name': country_name,
-                'retention_rate': retention_rate,
-                'largest_project_size': largest_project_size,
-                'average_project_size': average_project_size,
-                'total_references_count': total_references_count,
-            }
+        return partner_parser.parse_partner_profile(soup)
 
-        except Exception as e:
-            _logger.exception("Failed to parse single partner page: %s", e)
-            return {}
+    def _parse_partner_profile_page(self, html):
+        return partner_parser.parse_partner_profile_page(html, self._get_parser_backend())
 
     @api.model
+    @exclusive_job
     def cron_reprocess_flagged_partners(self):
+        """Refresh flagged partners from their profile pages.
+
+        Profiles are downloaded by the configured fetch engine and the parsed
+        values are applied in batches, with countries resolved from one
+        preloaded map per batch. Logs the throughput and every partner that
+        could not be refreshed; timings and counters go to a crawl run.
+        """
         flagged = self.search([('to_reprocess_references', '=', True)])
         if not flagged:
             _logger.info("No partners flagged for reprocessing.")
             return
 
-        _logger.info("Reprocessing %d flagged partners...", len(flagged))
-
+        partner_ids_by_url = defaultdict(list)
         for partner in flagged:
             if not partner.partner_url:
                 _logger.warning("Partner '%s' has no partner_url. Skipping.", partner.name)
                 continue
+            partner_ids_by_url[partner.partner_url].append(partner.id)
 
-            try:
-                time.sleep(random.uniform(0.1, 0.5))  # Speed: minimal delay
-                response = RETRY_SESSION.get(partner.partner_url, timeout=20)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, 'html.parser')
+        if not partner_ids_by_url:
+            _logger.warning("None of the %d flagged partners has a partner_url.", len(flagged))
+            return
+
+        _logger.info("Reprocessing %d flagged partners...", len(flagged))
+        started = time.monotonic()
+        Run = self.env['azk.partner.crawl.run'].sudo()
+        stats = crawl_stats.CrawlStats()
+        # Crawl writes skip the chatter tracking, the run posts one digest instead
+        self = self.with_context(partner_crawl_stats=stats, tracking_disable=True)
+        run = Run._get_resumable('reprocess_partners')
+        if run:
+            run.resume_count += 1
+        else:
+            run = Run._start(
+                f"Reprocess partners {fields.Datetime.to_string(fields.Datetime.now())}",
+                'reprocess_partners', [], 'partner',
+            )
+
+        config = self.env['ir.config_parameter'].sudo()
+        chunk_size = int(config.get_param('azk_odoo_partner_monitor.partner_upsert_chunk_size', '0'))
+        batch_size = chunk_size or 200
+        pending = {}
+        failures = {}
+        applied_urls = set()
 
-                data = self._parse_single_partner_page(soup)
+        def apply_batch():
+            if not pending:
+                return
+            self._apply_profile_values(pending, {'to_reprocess_references': False})
+            run.records_count += len(pending)
+            run._add_stats(stats)
+            pending.clear()
+            if chunk_size:
+                self.env.cr.commit()
+
+        def on_result(result):
+            partner_ids = partner_ids_by_url[result.url]
+            if result.error:
+                failures.update(dict.fromkeys(partner_ids, result.error))
+                return
+            if result.status == 304:
+                # Unchanged since it was last applied, only the flag is cleared
+                data = {}
+            else:
+                with stats.stage('parse'):
+                    data = self._parse_partner_profile_page(result.body)
                 if not data:
-                    _logger.error("Empty result for %s", partner.partner_url)
-                    continue
+                    failures.update(dict.fromkeys(partner_ids, "Empty result"))
+                    return
+            applied_urls.add(result.url)
+            pending.update(dict.fromkeys(partner_ids, data))
+            if len(pending) >= batch_size:
+                apply_batch()
+
+        with run._profile():
+            cache_batch = self._fetch_pages(list(partner_ids_by_url), on_result, 'profile')
+            apply_batch()
+        cache_batch['rows'] = [row for row in cache_batch['rows'] if row['url'] in applied_urls]
+        self._store_page_cache(cache_batch)
+        run._add_stats(stats)
+        run._finish()
+        self._after_crawl()
 
-                country_name = data.pop('country_name', None)
-                if country_name:
-                    country = self.env['azk.partner.country'].sudo().search([('name', '=', country_name)], limit=1)
-                    if not country:
-                        country = self.env['azk.partner.country'].sudo().create({'name': country_name})
-                    data['country_id'] = country.id
+        elapsed = time.monotonic() - started
+        refreshed = sum(len(partner_ids_by_url[url]) for url in applied_urls)
+        _logger.info(
+            "Reprocessed %d of %d flagged partners in %.1fs (%.2f profiles/sec)",
+            refreshed, len(flagged), elapsed, refreshed / elapsed if elapsed else 0.0,
+        )
+        for partner in self.browse(list(failures)):
+            _logger.error("Failed to reprocess %s: %s", partner.name, failures[partner.id])
+        return {'refreshed': refreshed, 'elapsed': elapsed, 'failures': failures}
 
-                partner.write(data)
-                partner.to_reprocess_references = False
-                _logger.info("Successfully reprocessed partner: %s", partner.name)
+    def _apply_profile_values(self, data_by_partner_id, extra_vals=None):
+        """Write parsed profile values to their partners, with one write per distinct change.
 
-            except Exception as e:
-                _logger.exception("Failed to reprocess %s: %s", partner.name, e)
\ No newline at end of file
+        Countries are resolved from one preloaded map; ``extra_vals`` are
+        written to every partner, changed or not.
+        """
+        stats = self._get_crawl_stats()
+        country_ids = self.env['azk.partner.country'].sudo()._get_or_create_by_names(
+            {data['country_name'] for data in data_by_partner_id.values() if data.get('country_name')}
+        )
+        values_by_id = {}
+        for partner_id, data in data_by_partner_id.items():
+            data = dict(data)
+            country_name = data.pop('country_name', None)
+            if country_name:
+                data['country_id'] = country_ids[country_name]
+            changes = self.browse(partner_id)._get_changed_values(data)
+            stats.count('partners_updated' if changes else 'partners_unchanged')
+            if changes or extra_vals:
+                values_by_id[partner_id] = dict(changes, **(extra_vals or {}))
+        with stats.stage('upsert', exclude='history'):
+            self._write_grouped(values_by_id)
+
+    # --- export ---
+
+    def _get_export_header(self):
+        return [
+            'Name', 'Profile URL', 'Odoo Partner ID', 'Country', 'Status', 'First Seen On',
+            'Retention Rate', 'Total References', 'Largest Project Size', 'Average Project Size',
+            'Status Changes', 'Last Status Change', 'Last Change Type', 'Previous Status',
+            'Reference Changes', 'Last Reference Change', 'Previous References',
+        ]
+
+    def _get_export_history(self, partner_ids):
+        """Return the status and reference history summaries of ``partner_ids``, keyed by partner id.
+
+        Each summary is the number of active history rows with the values of
+        the latest one, read in one DISTINCT ON query per history table.
+        """
+        cr = self.env.cr
+        cr.execute("""
+            SELECT DISTINCT ON (h.partner_id)
+                   h.partner_id, count(*) OVER (PARTITION BY h.partner_id), h.change_date, h.change_type, h.old_status
+            FROM azk_partner_status_history h
+            WHERE h.partner_id = ANY(%s) AND h.active
+            ORDER BY h.partner_id, h.change_date DESC, h.id DESC
+        """, [partner_ids])
+        status_history = {row[0]: row[1:] for row in cr.fetchall()}
+        cr.execute("""
+            SELECT DISTINCT ON (r.partner_id)
+                   r.partner_id, count(*) OVER (PARTITION BY r.partner_id), r.change_date, r.old_reference_count
+            FROM azk_partner_reference r
+            WHERE r.partner_id = ANY(%s) AND r.active
+            ORDER BY r.partner_id, r.change_date DESC NULLS LAST, r.id DESC
+        """, [partner_ids])
+        reference_history = {row[0]: row[1:] for row in cr.fetchall()}
+        return status_history, reference_history
+
+    def _iter_export_rows(self, chunk_size=1000):
+        """Yield the export row of every partner of the recordset, in order.
+
+        Partners are read ``chunk_size`` at a time: one query for their
+        fields, one for their countries and one per history table. The
+        cache is emptied after each chunk, so the memory used does not
+        grow with the selection.
+        """
+        status_labels = dict(self._fields['current_status'].selection)
+        change_labels = dict(self.env['azk.partner.status.history']._fields['change_type'].selection)
+        self.env['azk.partner.status.history'].flush_model()
+        self.env['azk.partner.reference'].flush_model()
+        for ids in split_every(chunk_size, self.ids):
+            partners = self.browse(ids)
+            partners.fetch([
+                'name', 'partner_url', 'odoo_partner_id', 'country_id', 'current_status', 'first_seen_on',
+                'retention_rate', 'total_references_count', 'largest_project_size', 'average_project_size',
+            ])
+            partners.country_id.fetch(['name'])
+            status_history, reference_history = self._get_export_history(list(ids))
+            for partner in partners:
+                status_count, status_date, change_type, old_status = status_history.get(partner.id, (0, None, None, None))
+                reference_count, reference_date, old_references = reference_history.get(partner.id, (0, None, None))
+                yield [
+                    partner.name, partner.partner_url or '', partner.odoo_partner_id or None,
+                    partner.country_id.name or '', status_labels.get(partner.current_status, ''),
+                    partner.first_seen_on, partner.retention_rate, partner.total_references_count,
+                    partner.largest_project_size, partner.average_project_size,
+                    status_count, status_date, change_labels.get(change_type, ''), status_labels.get(old_status, ''),
+                    reference_count, reference_date, old_references,
+                ]
+            self.env.invalidate_all()
+
+    def action_export(self, file_format='csv'):
+        """Download the selected partners, or all the partners of the list's domain when it is selected."""
+        # The web client sends the list's domain along with the selection, but
+        # only up to ``active_ids_limit`` ids of a selected domain
+        active_domain = self.env.context.get('active_domain')
+        ids_limit = int(self.env['ir.config_parameter'].sudo().get_param('web.active_ids_limit', '20000'))
+        if active_domain is not None and len(self) >= min(self.search_count(active_domain), ids_limit):
+            params = {'domain': json.dumps(active_domain)}
+        else:
+            params = {'ids': ','.join(map(str, self.ids))}
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/azk_partner_monitor/export/{file_format}?{urlencode(params)}',
+            'target': 'self',
+        }
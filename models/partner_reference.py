@@ -1,11 +1,186 @@
-from odoo import models, fields
+import logging
+from datetime import timedelta
 
-class PartnerReference(models.Model):
+from odoo import models, fields, api
+from odoo.tools import split_every
+from odoo.tools.sql import create_index
+from .partner_monitor_mixin import PartnerMonitorMixin, exclusive_job
+
+_logger = logging.getLogger(__name__)
+
+# Group the reference rows of a batch of partners into runs of the same
+# value (gaps and islands) and return the runs made only of rows older than
+# the cutoff. The latest row and the latest active row of each partner are
+# kept, the validation and the statistics read them.
+COMPACT_QUERY = """
+    WITH ordered AS (
+        SELECT r.id, r.partner_id, r.reference_count, r.change_date,
+               lead(r.change_date) OVER w AS next_change,
+               lag(r.reference_count) OVER w IS DISTINCT FROM r.reference_count AS starts_run,
+               row_number() OVER (PARTITION BY r.partner_id ORDER BY r.change_date DESC, r.id DESC) AS recency,
+               r.active AND row_number() OVER (
+                   PARTITION BY r.partner_id, r.active ORDER BY r.change_date DESC, r.id DESC
+               ) = 1 AS latest_active
+          FROM azk_partner_reference r
+         WHERE r.partner_id = ANY(%(partner_ids)s)
+        WINDOW w AS (PARTITION BY r.partner_id ORDER BY r.change_date, r.id)
+    ), runs AS (
+        SELECT *, sum(starts_run::integer) OVER (PARTITION BY partner_id ORDER BY change_date, id) AS run
+          FROM ordered
+    )
+    SELECT partner_id, reference_count, min(change_date), max(next_change), count(*), array_agg(id)
+      FROM runs
+     WHERE change_date < %(cutoff)s AND recency > 1 AND NOT latest_active
+  GROUP BY partner_id, run, reference_count
+  ORDER BY partner_id, min(change_date)
+"""
+
+
+class PartnerReference(models.Model, PartnerMonitorMixin):
     _name = 'azk.partner.reference'
     _description = 'Partner Reference'
 
     partner_id = fields.Many2one('azk.partner.partner', required=True, ondelete='cascade')
-    reference_count = fields.Char('Reference Count')
-    old_reference_count = fields.Char('Old Reference Count')
+    reference_count = fields.Integer('Reference Count')
+    old_reference_count = fields.Integer('Old Reference Count')
     active = fields.Boolean(default=True)
-    change_date = fields.Datetime(default=fields.Datetime.now)
\ No newline at end of file
+    change_date = fields.Datetime(default=fields.Datetime.now)
+
+    def init(self):
+        # Serves the "latest active reference per partner" lookups
+        create_index(
+            self.env.cr, 'azk_partner_reference_partner_active_date_idx',
+            self._table, ['partner_id', 'active', 'change_date'],
+        )
+
+    @api.model
+    def _compact_partners(self, partner_ids, cutoff):
+        """Collapse the reference rows of ``partner_ids`` older than ``cutoff`` into segments.
+
+        Each run of rows with the same count becomes one segment, or extends
+        the partner's last segment when it continues it. Returns the number
+        of reference rows removed.
+        """
+        self.flush_model()
+        cr = self.env.cr
+        cr.execute(COMPACT_QUERY, {'partner_ids': list(partner_ids), 'cutoff': cutoff})
+        runs = cr.fetchall()
+        if not runs:
+            return 0
+
+        Segment = self.env['azk.partner.reference.segment']
+        Segment.flush_model()
+        cr.execute("""
+            SELECT DISTINCT ON (partner_id) partner_id, id, reference_count, date_to
+              FROM azk_partner_reference_segment
+             WHERE partner_id = ANY(%s)
+          ORDER BY partner_id, date_from DESC, id DESC
+        """, [list({run[0] for run in runs})])
+        last_segments = {row[0]: row[1:] for row in cr.fetchall()}
+
+        new_segments, extended, compacted_ids = [], [], []
+        for partner_id, count, date_from, date_to, row_count, row_ids in runs:
+            compacted_ids.extend(row_ids)
+            # Only the first run of a partner can continue its last segment
+            last = last_segments.pop(partner_id, None)
+            if last and last[1] == count and last[2] == date_from:
+                extended.append((last[0], date_to, row_count))
+                continue
+            new_segments.append({
+                'partner_id': partner_id,
+                'reference_count': count,
+                'date_from': date_from,
+                'date_to': date_to,
+                'row_count': row_count,
+            })
+
+        Segment.create(new_segments)
+        if extended:
+            Segment.flush_model()
+            cr.execute("""
+                UPDATE azk_partner_reference_segment s
+                   SET date_to = v.date_to, row_count = s.row_count + v.row_count
+                  FROM (VALUES %s) AS v(id, date_to, row_count)
+                 WHERE s.id = v.id
+            """ % ', '.join(['(%s, %s::timestamp, %s)'] * len(extended)),
+                [value for row in extended for value in row])
+            Segment.invalidate_model(['date_to', 'row_count'])
+        cr.execute("DELETE FROM azk_partner_reference WHERE id = ANY(%s)", [compacted_ids])
+        self.invalidate_model()
+        return len(compacted_ids)
+
+    @api.model
+    def _apply_history_retention(self, horizon, action='archive'):
+        """Archive or delete segments and status history older than ``horizon``.
+
+        The latest status change of each partner is always kept. Returns the
+        number of affected rows.
+        """
+        for model in ('azk.partner.reference.segment', 'azk.partner.status.history'):
+            self.env[model].flush_model()
+        cr = self.env.cr
+        if action == 'delete':
+            segment_query = "DELETE FROM azk_partner_reference_segment WHERE date_to < %(horizon)s"
+            status_query = "DELETE FROM azk_partner_status_history h WHERE h.change_date < %(horizon)s"
+        else:
+            segment_query = """
+                UPDATE azk_partner_reference_segment SET active = false
+                 WHERE active AND date_to < %(horizon)s
+            """
+            status_query = """
+                UPDATE azk_partner_status_history h SET active = false
+                 WHERE h.active AND h.change_date < %(horizon)s
+            """
+        status_query += """
+            AND h.id NOT IN (
+                SELECT DISTINCT ON (partner_id) id FROM azk_partner_status_history
+                ORDER BY partner_id, change_date DESC, id DESC
+            )
+        """
+        cr.execute(segment_query, {'horizon': horizon})
+        affected = cr.rowcount
+        cr.execute(status_query, {'horizon': horizon.date()})
+        affected += cr.rowcount
+        for model in ('azk.partner.reference.segment', 'azk.partner.status.history'):
+            self.env[model].invalidate_model()
+        return affected
+
+    @api.model
+    @exclusive_job
+    def cron_compact_history(self):
+        """Compact old reference rows into segments and apply the history retention policy.
+
+        Partners are compacted in batches, each committed on its own. The
+        page archive is pruned along with the history.
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        compact_days = int(config.get_param('azk_odoo_partner_monitor.reference_compact_days', '0'))
+        retention_days = int(config.get_param('azk_odoo_partner_monitor.history_retention_days', '0'))
+        retention_action = config.get_param('azk_odoo_partner_monitor.history_retention_action', 'archive')
+        now = fields.Datetime.now()
+        try:
+            compacted = 0
+            if compact_days > 0:
+                cutoff = now - timedelta(days=compact_days)
+                self.flush_model()
+                self.env.cr.execute("""
+                    SELECT partner_id FROM azk_partner_reference
+                  GROUP BY partner_id
+                    HAVING count(*) > 1 AND min(change_date) < %s
+                """, [cutoff])
+                partner_ids = [row[0] for row in self.env.cr.fetchall()]
+                for batch in split_every(1000, partner_ids, list):
+                    compacted += self._compact_partners(batch, cutoff)
+                    self.env.cr.commit()
+
+            retired = 0
+            if retention_days > 0:
+                retired = self._apply_history_retention(now - timedelta(days=retention_days), retention_action)
+            _logger.info(
+                "History compaction: %d reference rows compacted, %d history rows %s",
+                compacted, retired, 'deleted' if retention_action == 'delete' else 'archived',
+            )
+            self.env['azk.partner.page.archive'].sudo()._evict()
+        except Exception as e:
+            self._post_cron_error('cron_compact_history', str(e))
+            _logger.exception("Error in cron_compact_history")
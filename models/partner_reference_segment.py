@@ -0,0 +1,14 @@
+from odoo import models, fields
+
+
+class PartnerReferenceSegment(models.Model):
+    _name = 'azk.partner.reference.segment'
+    _description = 'Partner Reference Segment'
+    _order = 'partner_id, date_from'
+
+    partner_id = fields.Many2one('azk.partner.partner', required=True, ondelete='cascade', index=True)
+    reference_count = fields.Integer('Reference Count')
+    date_from = fields.Datetime('From', required=True)
+    date_to = fields.Datetime('To', help="When the next reference count was recorded.")
+    row_count = fields.Integer('Compacted Rows')
+    active = fields.Boolean(default=True)
@@ -0,0 +1,140 @@
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# Reconstruct every partner's status and reference count as of a past day
+# from the history tables. Reference counts come from the raw rows and from
+# the segments older rows were compacted into. Country and project size
+# have no history, their current values are used.
+REBUILD_QUERY = """
+    INSERT INTO azk_partner_stat_snapshot
+        (date, country_id, status, partner_count, references_sum, references_avg,
+         bucket_lt_5, bucket_5_10, bucket_11_25, bucket_25_plus,
+         create_uid, create_date, write_uid, write_date)
+    SELECT %(date)s, p.country_id, st.status, count(*), sum(rf.refs), avg(rf.refs),
+           count(*) FILTER (WHERE p.project_size_bucket = '<5' OR p.project_size_bucket IS NULL),
+           count(*) FILTER (WHERE p.project_size_bucket = '5-10'),
+           count(*) FILTER (WHERE p.project_size_bucket = '11-25'),
+           count(*) FILTER (WHERE p.project_size_bucket = '25+'),
+           %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+    FROM azk_partner_partner p
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(
+            (SELECT h.new_status FROM azk_partner_status_history h
+              WHERE h.partner_id = p.id AND h.change_date <= %(date)s
+              ORDER BY h.change_date DESC, h.id DESC LIMIT 1),
+            (SELECT h.old_status FROM azk_partner_status_history h
+              WHERE h.partner_id = p.id AND h.change_date > %(date)s
+              ORDER BY h.change_date, h.id LIMIT 1),
+            p.current_status
+        ) AS status
+    ) st
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(
+            (SELECT v.reference_count FROM (
+                SELECT r.reference_count, r.change_date AS since, r.id
+                  FROM azk_partner_reference r
+                 WHERE r.partner_id = p.id AND r.change_date < %(next_day)s
+                 UNION ALL
+                SELECT s.reference_count, s.date_from, 0
+                  FROM azk_partner_reference_segment s
+                 WHERE s.partner_id = p.id AND s.date_from < %(next_day)s
+              ) v
+              ORDER BY v.since DESC, v.id DESC LIMIT 1),
+            (SELECT r.old_reference_count FROM azk_partner_reference r
+              WHERE r.partner_id = p.id AND r.change_date >= %(next_day)s
+              ORDER BY r.change_date, r.id LIMIT 1),
+            p.total_references_count
+        ) AS refs
+    ) rf
+    WHERE p.first_seen_on <= %(date)s
+    GROUP BY p.country_id, st.status
+"""
+
+
+class PartnerStatSnapshot(models.Model):
+    _name = 'azk.partner.stat.snapshot'
+    _description = 'Partner Daily Statistics'
+    _order = 'date desc, country_id, status'
+
+    date = fields.Date(string='Date', required=True, index=True)
+    country_id = fields.Many2one('azk.partner.country', string='Country', ondelete='cascade', index=True)
+    status = fields.Selection([
+        ('gold', 'Gold'),
+        ('silver', 'Silver'),
+        ('ready', 'Ready'),
+    ], string='Status')
+    partner_count = fields.Integer(string='Partners')
+    references_sum = fields.Integer(string='Total References')
+    references_avg = fields.Float(string='Average References', aggregator='avg')
+    bucket_lt_5 = fields.Integer(string='Project Size <5')
+    bucket_5_10 = fields.Integer(string='Project Size 5-10')
+    bucket_11_25 = fields.Integer(string='Project Size 11-25')
+    bucket_25_plus = fields.Integer(string='Project Size 25+')
+
+    @api.model
+    def _capture_snapshot(self, date=None):
+        """Aggregate the live partner table into the rows of ``date`` (today by default).
+
+        Days missed since the previous snapshot are first rebuilt from the
+        history tables, up to 31 days back.
+        """
+        date = date or fields.Date.context_today(self)
+        last = self.search([('date', '<', date)], order='date desc', limit=1).date
+        if last:
+            self._rebuild_snapshots(max(last + timedelta(days=1), date - timedelta(days=31)), date - timedelta(days=1))
+
+        self.env['azk.partner.partner'].flush_model()
+        cr = self.env.cr
+        cr.execute("DELETE FROM azk_partner_stat_snapshot WHERE date = %s", [date])
+        cr.execute("""
+            INSERT INTO azk_partner_stat_snapshot
+                (date, country_id, status, partner_count, references_sum, references_avg,
+                 bucket_lt_5, bucket_5_10, bucket_11_25, bucket_25_plus,
+                 create_uid, create_date, write_uid, write_date)
+            SELECT %(date)s, country_id, current_status, count(*),
+                   sum(total_references_count), avg(total_references_count),
+                   count(*) FILTER (WHERE project_size_bucket = '<5' OR project_size_bucket IS NULL),
+                   count(*) FILTER (WHERE project_size_bucket = '5-10'),
+                   count(*) FILTER (WHERE project_size_bucket = '11-25'),
+                   count(*) FILTER (WHERE project_size_bucket = '25+'),
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+            FROM azk_partner_partner
+            GROUP BY country_id, current_status
+        """, {'date': date, 'uid': self.env.uid})
+        self.invalidate_model()
+
+    @api.model
+    def _rebuild_snapshots(self, date_from, date_to, force=False):
+        """Rebuild the snapshots of a date range from the status and reference history.
+
+        Only days without snapshot rows are rebuilt unless ``force`` is set.
+        """
+        if date_from > date_to:
+            return 0
+        for model in ('azk.partner.partner', 'azk.partner.status.history', 'azk.partner.reference',
+                      'azk.partner.reference.segment'):
+            self.env[model].flush_model()
+        cr = self.env.cr
+        if force:
+            cr.execute("DELETE FROM azk_partner_stat_snapshot WHERE date BETWEEN %s AND %s", [date_from, date_to])
+            existing = set()
+        else:
+            cr.execute("SELECT DISTINCT date FROM azk_partner_stat_snapshot WHERE date BETWEEN %s AND %s",
+                       [date_from, date_to])
+            existing = {row[0] for row in cr.fetchall()}
+
+        rebuilt = 0
+        day = date_from
+        while day <= date_to:
+            if day not in existing:
+                cr.execute(REBUILD_QUERY, {'date': day, 'next_day': day + timedelta(days=1), 'uid': self.env.uid})
+                rebuilt += 1
+            day += timedelta(days=1)
+        self.invalidate_model()
+        if rebuilt:
+            _logger.info("Rebuilt %d daily partner snapshots between %s and %s", rebuilt, date_from, date_to)
+        return rebuilt
@@ -16,6 +16,7 @@ class PartnerStatusHistory(models.Model):
         ('ready','Ready'),
     ], string='New Status', required=True)
     change_date = fields.Date(string='Change Date', default=fields.Date.context_today)
+    active = fields.Boolean(default=True)
     change_type = fields.Selection([
         ('initial','Initial'),
         ('promoted','Promoted'),
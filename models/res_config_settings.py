@@ -20,6 +20,172 @@ class ResConfigSettings(models.TransientModel):
     'res.country', string="Specific Country (Odoo Country)",
     config_parameter='azk_odoo_partner_monitor.partner_country_id')
 
+    partner_directory_url = fields.Char(
+        string="Partner Directory URL",
+        default='https://www.odoo.com',
+        config_parameter='azk_odoo_partner_monitor.partner_directory_url',
+        help="Root URL the partner directory is crawled from. Point it at a local stand-in server "
+             "(tools/partner_directory_standin.py) to benchmark the crawler offline."
+    )
+
+    partner_fetch_engine = fields.Selection([
+        ('threads', 'Thread Pool'),
+        ('async', 'Asynchronous (aiohttp)'),
+    ], string="Partner Fetch Engine", default='threads',
+       config_parameter='azk_odoo_partner_monitor.partner_fetch_engine',
+       help="The asynchronous engine adapts its concurrency to the server response times "
+            "and requires the aiohttp Python package.")
+
+    partner_fetch_max_concurrency = fields.Integer(
+        string="Max Concurrent Requests",
+        default=32,
+        config_parameter='azk_odoo_partner_monitor.partner_fetch_max_concurrency',
+        help="Upper bound of concurrent requests and pooled connections for the asynchronous engine."
+    )
+
+    partner_parse_workers = fields.Integer(
+        string="Parser Processes",
+        default=0,
+        config_parameter='azk_odoo_partner_monitor.partner_parse_workers',
+        help="Number of worker processes used to parse fetched pages. "
+             "0 parses the pages in the Odoo worker itself."
+    )
+
+    partner_parser_backend = fields.Selection([
+        ('bs4', 'BeautifulSoup'),
+        ('lxml', 'lxml (fast)'),
+    ], string="Partner Parser Backend", default='bs4',
+       config_parameter='azk_odoo_partner_monitor.partner_parser_backend',
+       help="Both backends extract the same values; lxml is several times faster per page.")
+
+    partner_upsert_chunk_size = fields.Integer(
+        string="Commit Chunk Size",
+        default=0,
+        config_parameter='azk_odoo_partner_monitor.partner_upsert_chunk_size',
+        help="When set, scraped partners are saved and committed in chunks of this size while the "
+             "crawl is running, so an interrupted run resumes where it stopped. "
+             "0 saves everything in one transaction at the end of the crawl."
+    )
+
+    partner_crawl_page_retries = fields.Integer(
+        string="Page Attempts",
+        default=3,
+        config_parameter='azk_odoo_partner_monitor.partner_crawl_page_retries',
+        help="How many times a page that failed is attempted within a crawl run before it is given up."
+    )
+
+    partner_crawl_resume_hours = fields.Integer(
+        string="Resume Window (Hours)",
+        default=24,
+        config_parameter='azk_odoo_partner_monitor.partner_crawl_resume_hours',
+        help="An interrupted crawl run is resumed by the next fetch if it started less than this many hours ago."
+    )
+
+    partner_country_concurrency = fields.Integer(
+        string="Concurrent Country Crawls",
+        default=4,
+        config_parameter='azk_odoo_partner_monitor.partner_country_concurrency',
+        help="How many flagged countries are re-crawled at the same time."
+    )
+
+    partner_crawl_shard_pages = fields.Integer(
+        string="Crawl Shard Size (Pages)",
+        default=0,
+        config_parameter='azk_odoo_partner_monitor.partner_crawl_shard_pages',
+        help="When set, crawl runs are split in shards of this many pages, crawled and committed one at "
+             "a time by the fetch cron and the crawl worker crons. 0 crawls every run in the fetch cron alone."
+    )
+
+    partner_crawl_shard_workers = fields.Integer(
+        string="Crawl Worker Crons",
+        default=1,
+        config_parameter='azk_odoo_partner_monitor.partner_crawl_shard_workers',
+        help="Number of \"Crawl Partner Shards\" crons helping sharded crawls. Each one can run on a "
+             "different cron worker or server, up to the number of cron workers available."
+    )
+
+    page_cache_enabled = fields.Boolean(
+        string="Page Cache",
+        config_parameter='azk_odoo_partner_monitor.page_cache_enabled',
+        help="Send conditional requests and skip pages whose content has not changed since the last run."
+    )
+
+    page_cache_max_age_days = fields.Integer(
+        string="Page Cache Max Age (Days)",
+        default=7,
+        config_parameter='azk_odoo_partner_monitor.page_cache_max_age_days'
+    )
+
+    page_cache_max_entries = fields.Integer(
+        string="Page Cache Max Entries",
+        default=10000,
+        config_parameter='azk_odoo_partner_monitor.page_cache_max_entries'
+    )
+
+    page_archive_enabled = fields.Boolean(
+        string="Page Archive",
+        config_parameter='azk_odoo_partner_monitor.page_archive_enabled',
+        help="Keep every fetched page compressed in the filestore, so it can be parsed again later without HTTP."
+    )
+
+    page_archive_compression = fields.Selection([
+        ('zstd', 'zstd'),
+        ('gzip', 'gzip'),
+    ], string="Page Archive Compression", default='zstd',
+       config_parameter='azk_odoo_partner_monitor.page_archive_compression',
+       help="zstd requires the zstandard library, gzip is used when it is missing.")
+
+    page_archive_retention_days = fields.Integer(
+        string="Page Archive Retention (Days)",
+        default=0,
+        config_parameter='azk_odoo_partner_monitor.page_archive_retention_days',
+        help="Archived fetches older than this are dropped. 0 keeps the whole archive."
+    )
+
+    crawl_profile_min_seconds = fields.Integer(
+        string="Profile Crawls Slower Than (Seconds)",
+        default=0,
+        config_parameter='azk_odoo_partner_monitor.crawl_profile_min_seconds',
+        help="Sample crawl runs with the Odoo profiler and keep the profile of runs lasting longer "
+             "than this. 0 disables profiling."
+    )
+
+    reference_compact_days = fields.Integer(
+        string="Compact References After (Days)",
+        default=0,
+        config_parameter='azk_odoo_partner_monitor.reference_compact_days',
+        help="Reference history rows older than this are collapsed into segments of unchanged counts. "
+             "0 disables the compaction."
+    )
+
+    history_retention_days = fields.Integer(
+        string="History Retention (Days)",
+        default=0,
+        config_parameter='azk_odoo_partner_monitor.history_retention_days',
+        help="Reference segments and status changes older than this are archived or deleted. "
+             "The latest status change of each partner is always kept. 0 keeps the whole history."
+    )
+
+    history_retention_action = fields.Selection([
+        ('archive', 'Archive'),
+        ('delete', 'Delete'),
+    ], string="Expired History", default='archive',
+       config_parameter='azk_odoo_partner_monitor.history_retention_action')
+
+    export_chunk_size = fields.Integer(
+        string="Export Chunk Size",
+        default=1000,
+        config_parameter='azk_odoo_partner_monitor.export_chunk_size',
+        help="Partners read at a time by the CSV and XLSX exports."
+    )
+
+    report_chunk_size = fields.Integer(
+        string="PDF Report Chunk Size",
+        default=200,
+        config_parameter='azk_odoo_partner_monitor.report_chunk_size',
+        help="Partner reports of more partners than this are rendered in chunks of this size and merged."
+    )
+
     partner_monitor_error_user_id = fields.Many2one(
         'res.users',
         string="Partner Monitor Error Receiver User",
@@ -27,6 +193,10 @@ class ResConfigSettings(models.TransientModel):
         help="The user who will be notified in chat when a cron fails."
     )
 
+    def set_values(self):
+        super().set_values()
+        self.env['azk.partner.crawl.run'].sudo()._sync_shard_workers(self.partner_crawl_shard_workers)
+
     @api.onchange('partner_fetch_mode')
     def _onchange_partner_fetch_mode(self):
         if self.partner_fetch_mode != 'specific':
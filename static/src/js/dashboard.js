@@ -1,12 +1,22 @@
 /** @odoo-module **/
-import { Component, onWillStart, onMounted, useState } from '@odoo/owl';
+import { Component, onWillStart, onMounted, onWillUnmount, useState } from '@odoo/owl';
 import { registry } from '@web/core/registry';
 import { useService } from '@web/core/utils/hooks';
 import { loadJS, AssetsLoadingError } from '@web/core/assets';
 
+// Dashboard results and filter options, kept across openings of the
+// dashboard. The data only changes when a crawl runs, so everything is
+// dropped as soon as the server reports a new data version.
+const dashboardCache = {
+    version: null,
+    filterOptions: null,
+    results: new Map(),
+};
+
 class PartnerDashboard extends Component {
     setup() {
         this.orm = useService('orm');
+        this.charts = {};
         this.state = useState({
             statusFilter: '',
             countryFilter: '',
@@ -24,51 +34,55 @@ class PartnerDashboard extends Component {
                 }
                 console.error('Chart.js loading failed');
             }
+            await this.validateCache();
             await this.fetchFilterOptions();
         });
 
         onMounted(() => {
             this.loadAndRender();
         });
+
+        onWillUnmount(() => {
+            Object.values(this.charts).forEach(chart => chart.destroy());
+        });
     }
 
-    async fetchFilterOptions() {
+    async validateCache() {
         try {
-            this.state.availableCountries = await this.orm.searchRead(
-                'azk.partner.country',
-                [],
-                ['id', 'name'],
-                { order: 'name ASC', limit: 1000 }
-            );
-        } catch (countryError) {
-            console.error('Failed to fetch countries', countryError);
-            this.state.availableCountries = [
-                {id: 1, name: 'United States'},
-                {id: 2, name: 'Canada'},
-            ];
+            const version = await this.orm.call('azk.partner.partner', 'get_dashboard_version', []);
+            if (version !== dashboardCache.version) {
+                dashboardCache.version = version;
+                dashboardCache.filterOptions = null;
+                dashboardCache.results.clear();
+            }
+        } catch (error) {
+            console.error('Failed to fetch the dashboard data version', error);
+            dashboardCache.filterOptions = null;
+            dashboardCache.results.clear();
         }
+    }
 
-        try {
-            const yearGroups = await this.orm.readGroup(
-                'azk.partner.partner',
-                [['first_seen_on', '!=', null]],
-                ['first_seen_on'],
-                ['first_seen_on'],
-                { groupby: 'first_seen_on desc' }
-            );
-
-            this.state.availableYears = yearGroups
-                .map(group => group.first_seen_on)
-                .filter(year => year !== null && year !== undefined)
-                .sort((a, b) => b - a);
-        } catch (yearError) {
-            console.error('Failed to fetch years', yearError);
-            const currentYear = new Date().getFullYear();
-            this.state.availableYears = Array.from(
-                {length: 10},
-                (_, i) => currentYear - i
-            );
+    async fetchFilterOptions() {
+        if (!dashboardCache.filterOptions) {
+            try {
+                dashboardCache.filterOptions = await this.orm.call(
+                    'azk.partner.partner',
+                    'get_dashboard_filter_options',
+                    []
+                );
+            } catch (error) {
+                console.error('Failed to fetch filter options', error);
+                const currentYear = new Date().getFullYear();
+                this.state.availableCountries = [];
+                this.state.availableYears = Array.from(
+                    {length: 10},
+                    (_, i) => currentYear - i
+                );
+                return;
+            }
         }
+        this.state.availableCountries = dashboardCache.filterOptions.countries;
+        this.state.availableYears = dashboardCache.filterOptions.years;
     }
 
     get domain() {
@@ -76,133 +90,42 @@ class PartnerDashboard extends Component {
         const { statusFilter, countryFilter, yearFilter } = this.state;
         if (statusFilter) domain.push(['current_status', '=', statusFilter]);
         if (countryFilter) domain.push(['country_id', '=', parseInt(countryFilter)]);
-        if (yearFilter) domain.push(['first_seen_on', '=', parseInt(yearFilter)]);
+        if (yearFilter) {
+            domain.push(['first_seen_on', '>=', `${yearFilter}-01-01`]);
+            domain.push(['first_seen_on', '<=', `${yearFilter}-12-31`]);
+        }
         return domain;
     }
 
+    async fetchDashboardData() {
+        const domain = this.domain;
+        const key = JSON.stringify(domain);
+        if (!dashboardCache.results.has(key)) {
+            // Status matrix and size distribution are aggregated server side
+            const data = await this.orm.call('azk.partner.partner', 'get_dashboard_data', [domain]);
+            dashboardCache.results.set(key, data);
+        }
+        return dashboardCache.results.get(key);
+    }
+
     async loadAndRender() {
         try {
-            // Fetch partner data with country information
-            const partnersData = await this.orm.call(
-                'azk.partner.partner',
-                'read_group',
-                [
-                    this.domain,
-                    ['id:count', 'current_status', 'country_id'],
-                    ['country_id', 'current_status']
-                ],
-                { lazy: false }
-            );
-
-            // Fetch project data with country information
-            const projectsData = await this.orm.call(
-                'azk.partner.partner',
-                'search_read',
-                [
-                    this.domain,
-                    ['average_project_size', 'country_id']
-                ],
-                { limit: 10000 }
-            );
-
-            // Get country names
-            const countryIds = [
-                ...new Set([
-                    ...partnersData.map(p => p.country_id ? p.country_id[0] : null),
-                    ...projectsData.map(p => p.country_id ? p.country_id[0] : null)
-                ].filter(id => id !== null))
-            ];
-
-            const countriesInfo = await this.orm.searchRead(
-                'azk.partner.country',
-                [['id', 'in', countryIds]],
-                ['id', 'name']
-            );
-
-            const countryNames = {};
-            countriesInfo.forEach(country => {
-                countryNames[country.id] = country.name;
-            });
-
-            // Partner data processing
-            const groupedPartners = {};
-            partnersData.forEach(g => {
-                const countryId = g.country_id ? g.country_id[0] : null;
-                const countryName = countryId ? countryNames[countryId] || 'Unknown' : 'Unknown';
-
-                if (!groupedPartners[countryId]) {
-                    groupedPartners[countryId] = {
-                        id: countryId,
-                        name: countryName,
-                        gold: 0,
-                        silver: 0,
-                        ready: 0
-                    };
-                }
-                groupedPartners[countryId][g.current_status] = g['__count'];
-            });
-
-            // Convert to matrix and sort by number of partners
-            const sortedCountries = Object.values(groupedPartners).sort((a, b) => {
-                const totalA = a.gold + a.silver + a.ready;
-                const totalB = b.gold + b.silver + b.ready;
-                return totalB - totalA;
-            });
-
-            const top5 = sortedCountries.slice(0, 5);
-            const bottom5 = sortedCountries.slice(-5);
-
-            // Project data processing
-            const projectBuckets = {};
-            projectsData.forEach(p => {
-                const countryId = p.country_id ? p.country_id[0] : null;
-                const countryName = countryId ? countryNames[countryId] || 'Unknown' : 'Unknown';
-                const size = p.average_project_size || 0;
-
-                let bucket = '<5';
-                if (size >= 25) bucket = '25+';
-                else if (size >= 11) bucket = '11-25';
-                else if (size >= 5) bucket = '5-10';
-
-                if (!projectBuckets[countryId]) {
-                    projectBuckets[countryId] = {
-                        name: countryName,
-                        '<5': 0,
-                        '5-10': 0,
-                        '11-25': 0,
-                        '25+': 0
-                    };
-                }
-                projectBuckets[countryId][bucket] += 1;
-            });
+            const { top, bottom } = await this.fetchDashboardData();
 
             // Preparing data for graphs
             const prepareChartData = (countries) => {
-                return countries.map(country => {
-                    const buckets = projectBuckets[country.id] || {
-                        name: country.name,
-                        '<5': 0,
-                        '5-10': 0,
-                        '11-25': 0,
-                        '25+': 0
-                    };
-
-                    return {
-                        countryName: buckets.name,
-                        '<5': buckets['<5'],
-                        '5-10': buckets['5-10'],
-                        '11-25': buckets['11-25'],
-                        '25+': buckets['25+'],
-                        total: buckets['<5'] + buckets['5-10'] + buckets['11-25'] + buckets['25+']
-                    };
-                }).filter(d => d.total > 0);
+                return countries.map(country => ({
+                    countryName: country.name,
+                    '<5': country['<5'],
+                    '5-10': country['5-10'],
+                    '11-25': country['11-25'],
+                    '25+': country['25+'],
+                    total: country.total
+                })).filter(d => d.total > 0);
             };
 
-            const top5Data = prepareChartData(top5);
-            const bottom5Data = prepareChartData(bottom5);
-
-            this.renderPartnerCharts(top5, bottom5);
-            this.renderSizeCharts(top5Data, bottom5Data);
+            this.renderPartnerCharts(top, bottom);
+            this.renderSizeCharts(prepareChartData(top), prepareChartData(bottom));
         } catch (error) {
             console.error('Error in loadAndRender:', error);
             const errorContainer = document.getElementById('dashboard-error');
@@ -216,6 +139,44 @@ class PartnerDashboard extends Component {
         }
     }
 
+    renderChart(elementId, config, emptyMessage) {
+        const el = document.getElementById(elementId);
+        if (!el) return;
+        const chart = this.charts[elementId];
+        let placeholder = el.nextElementSibling;
+        if (!placeholder || !placeholder.classList.contains('o_azk_chart_empty')) {
+            placeholder = null;
+        }
+        if (!config.data.labels.length) {
+            // A canvas does not show its content, the message goes next to it
+            if (chart) {
+                chart.destroy();
+                delete this.charts[elementId];
+            }
+            el.classList.add('d-none');
+            if (!placeholder) {
+                placeholder = document.createElement('div');
+                placeholder.className = 'o_azk_chart_empty text-center p-3';
+                el.after(placeholder);
+            }
+            placeholder.textContent = emptyMessage;
+            return;
+        }
+        el.classList.remove('d-none');
+        if (placeholder) placeholder.remove();
+
+        // Existing charts only get their data replaced and animate to it
+        if (chart) {
+            chart.data.labels = config.data.labels;
+            config.data.datasets.forEach((dataset, index) => {
+                chart.data.datasets[index].data = dataset.data;
+            });
+            chart.update();
+            return;
+        }
+        this.charts[elementId] = new Chart(el, config);
+    }
+
     renderPartnerCharts(top, bottom) {
         const buildConfig = (data, title) => ({
             type: 'bar',
@@ -242,21 +203,11 @@ class PartnerDashboard extends Component {
             },
         });
 
-        const renderChart = (elementId, data, title) => {
-            const el = document.getElementById(elementId);
-            if (!el) return;
-
-            if (el.chart) el.chart.destroy();
-
-            if (data.length > 0) {
-                el.chart = new Chart(el, buildConfig(data, title));
-            } else {
-                el.innerHTML = `<div class="text-center p-3">No data available for ${title}</div>`;
-            }
+        const render = (elementId, data, title) => {
+            this.renderChart(elementId, buildConfig(data, title), `No data available for ${title}`);
         };
-
-        renderChart('top_countries_chart', top, 'Top 5 Countries by Partners');
-        renderChart('bottom_countries_chart', bottom, 'Bottom 5 Countries by Partners');
+        render('top_countries_chart', top, 'Top 5 Countries by Partners');
+        render('bottom_countries_chart', bottom, 'Bottom 5 Countries by Partners');
     }
 
     renderSizeCharts(topData, bottomData) {
@@ -308,21 +259,11 @@ class PartnerDashboard extends Component {
             };
         };
 
-        const renderChart = (elementId, data, title) => {
-            const el = document.getElementById(elementId);
-            if (!el) return;
-
-            if (el.chart) el.chart.destroy();
-
-            if (data.length > 0) {
-                el.chart = new Chart(el, buildConfig(data, title));
-            } else {
-                el.innerHTML = `<div class="text-center p-3">No project data available for ${title}</div>`;
-            }
+        const render = (elementId, data, title) => {
+            this.renderChart(elementId, buildConfig(data, title), `No project data available for ${title}`);
         };
-
-        renderChart('top_project_distribution_chart', topData, 'Top 5 Countries Project Size Distribution');
-        renderChart('bottom_project_distribution_chart', bottomData, 'Bottom 5 Countries Project Size Distribution');
+        render('top_project_distribution_chart', topData, 'Top 5 Countries Project Size Distribution');
+        render('bottom_project_distribution_chart', bottomData, 'Bottom 5 Countries Project Size Distribution');
     }
 
     applyFilters() {
@@ -0,0 +1,2 @@
+from . import test_partner_parser
+from . import test_partner_country
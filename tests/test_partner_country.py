@@ -0,0 +1,26 @@
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestPartnerCountry(TransactionCase):
+
+    def test_upsert_partner_of_archived_country(self):
+        country = self.env['azk.partner.country'].create({'name': 'Archivistan'})
+        country.active = False
+        Partner = self.env['azk.partner.partner'].with_context(tracking_disable=True)
+        Partner._upsert_partner_records([('Acme Solutions', {
+            'partner_url': 'https://www.odoo.com/partners/acme-solutions-1234',
+            'current_status': 'gold',
+            'country_name': 'Archivistan',
+            'retention_rate': 92.0,
+            'total_references_count': 37,
+            'largest_project_size': 120,
+            'average_project_size': 14.5,
+        })])
+        partner = Partner.search([('odoo_partner_id', '=', 1234)])
+        self.assertEqual(partner.country_id, country)
+        self.assertEqual(
+            self.env['azk.partner.country'].with_context(active_test=False).search_count(
+                [('name', '=', 'Archivistan')]),
+            1,
+        )
@@ -0,0 +1,109 @@
+"""Parity of the bs4 and lxml parser backends on saved odoo.com pages.
+
+The parsers only depend on the page markup: outside of Odoo these tests
+run with
+``python -m unittest discover -s tests -t tests -p 'test_partner_parser.py'``.
+"""
+import importlib.util
+import os
+
+try:
+    from odoo.tests import BaseCase as TestCase
+except ImportError:
+    from unittest import TestCase
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(TESTS_DIR, 'fixtures')
+
+# Loaded from its file, importing the addon package would require Odoo
+_spec = importlib.util.spec_from_file_location(
+    'azk_partner_parser', os.path.join(TESTS_DIR, os.pardir, 'tools', 'partner_parser.py'))
+partner_parser = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(partner_parser)
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as fixture:
+        return fixture.read()
+
+
+class TestParserParity(TestCase):
+
+    def parse_both(self, parse, html):
+        """Parse ``html`` with both backends, check they agree and return the result."""
+        for body in (html, html.decode()):
+            results = {backend: parse(body, backend) for backend in partner_parser.BACKENDS}
+            self.assertEqual(results['bs4'], results['lxml'])
+        return results['bs4']
+
+    def test_partner_list(self):
+        records = dict(self.parse_both(partner_parser.parse_partner_list, read_fixture('partner_list.html')))
+        self.assertEqual(records['Acme Solutions'], {
+            'partner_url': 'https://www.odoo.com/partners/acme-solutions-1234',
+            'current_status': 'gold',
+            'country_name': 'Belgium',
+            'retention_rate': 92.0,
+            'total_references_count': 37,
+            'largest_project_size': 120,
+            'average_project_size': 14.5,
+        })
+        self.assertEqual(records['Blue River Ltd']['current_status'], 'silver')
+        self.assertEqual(records['Blue River Ltd']['average_project_size'], 0.0)
+
+    def test_partner_list_missing_country(self):
+        records = dict(self.parse_both(partner_parser.parse_partner_list, read_fixture('partner_list.html')))
+        self.assertEqual(records['Nowhere Consulting']['country_name'], 'Unknown')
+        self.assertEqual(records['Nowhere Consulting']['retention_rate'], 0.0)
+        self.assertEqual(records['Fresh Start']['total_references_count'], 0)
+
+    def test_partner_list_non_numeric_references(self):
+        with self.assertLogs(partner_parser._logger, 'WARNING'):
+            records = dict(self.parse_both(partner_parser.parse_partner_list, read_fixture('partner_list.html')))
+        self.assertNotIn('Vague Partners', records)
+        self.assertEqual(len(records), 4)
+
+    def test_partner_profile(self):
+        values = self.parse_both(partner_parser.parse_partner_profile_page, read_fixture('partner_profile.html'))
+        self.assertEqual(values, {
+            'country_name': 'Belgium',
+            'retention_rate': 92.0,
+            'largest_project_size': 120,
+            'average_project_size': 14.5,
+            'total_references_count': 37,
+        })
+
+    def test_partner_profile_edge_cases(self):
+        values = self.parse_both(partner_parser.parse_partner_profile_page, read_fixture('partner_profile_edge.html'))
+        self.assertEqual(values, {
+            'country_name': 'Unknown',
+            'retention_rate': 0.0,
+            'largest_project_size': 0,
+            'average_project_size': 0.0,
+            'total_references_count': 0,
+        })
+
+    def test_country_directory(self):
+        directory = self.parse_both(partner_parser.parse_country_directory, read_fixture('country_index.html'))
+        self.assertEqual(directory, [
+            ('Belgium', 'belgium', '20'),
+            ('United Kingdom', 'united-kingdom', '231'),
+            ("Côte d'Ivoire", 'cote-d-ivoire', '225'),
+        ])
+
+    def test_empty_page(self):
+        for html in (b'', b'   \n', b'<html><body></body></html>'):
+            self.assertEqual(self.parse_both(partner_parser.parse_partner_list, html), [])
+            self.assertEqual(self.parse_both(partner_parser.parse_country_directory, html), [])
+            self.assertEqual(self.parse_both(partner_parser.parse_partner_profile_page, html), {
+                'country_name': 'Unknown',
+                'retention_rate': 0.0,
+                'largest_project_size': 0,
+                'average_project_size': 0.0,
+                'total_references_count': 0,
+            })
+
+    def test_partner_id(self):
+        self.assertEqual(partner_parser.parse_partner_id('https://www.odoo.com/partners/acme-solutions-1234'), 1234)
+        self.assertEqual(partner_parser.parse_partner_id('/partners/acme-1234/'), 1234)
+        self.assertIsNone(partner_parser.parse_partner_id('/partners/acme-solutions'))
+        self.assertIsNone(partner_parser.parse_partner_id(None))
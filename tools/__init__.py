@@ -0,0 +1,5 @@
+from . import async_fetcher
+from . import partner_parser
+from . import crawl_stats
+from . import page_archive
+from . import partner_export
@@ -0,0 +1,130 @@
+"""Asynchronous page fetcher with adaptive concurrency.
+
+Used by the ``async`` fetch engine of ``azk.partner.partner``. The whole
+crawl runs on a private event loop in the calling thread, so a large crawl
+needs no extra OS threads inside the Odoo worker.
+"""
+import asyncio
+import logging
+import time
+from collections import namedtuple
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+_logger = logging.getLogger(__name__)
+
+# Statuses that mean "slow down" rather than "this page is broken"
+THROTTLE_STATUSES = {429, 500, 502, 503, 504}
+
+# ``elapsed`` is the time spent waiting on the server over all attempts,
+# ``retries`` the number of extra attempts and ``throttled`` how many of
+# the answers were throttling statuses.
+FetchResult = namedtuple(
+    'FetchResult',
+    ['url', 'status', 'body', 'error', 'etag', 'last_modified', 'elapsed', 'retries', 'throttled'],
+    defaults=(0.0, 0, 0),
+)
+
+
+class AdaptiveLimiter:
+    """Additive-increase / multiplicative-decrease concurrency limit.
+
+    The limit grows by roughly one slot per round of healthy responses,
+    shrinks by one when latency exceeds twice the target and is halved on
+    throttling responses (429/5xx) or transport errors.
+    """
+
+    def __init__(self, initial, minimum, maximum, target_latency):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.target_latency = target_latency
+        self._in_flight = 0
+        self._credit = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+    async def release(self, latency, throttled=False):
+        async with self._cond:
+            self._in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit // 2)
+                self._credit = 0.0
+            elif latency > 2 * self.target_latency:
+                self.limit = max(self.minimum, self.limit - 1)
+            elif latency <= self.target_latency:
+                self._credit += 1.0 / self.limit
+                if self._credit >= 1.0:
+                    self._credit = 0.0
+                    self.limit = min(self.maximum, self.limit + 1)
+            self._cond.notify_all()
+
+
+async def _fetch_one(session, limiter, url, headers, retries, backoff):
+    error = None
+    elapsed, throttled_count = 0.0, 0
+    for attempt in range(retries + 1):
+        if attempt:
+            await asyncio.sleep(backoff * 2 ** (attempt - 1))
+        await limiter.acquire()
+        start = time.monotonic()
+        status, body, throttled = None, None, True
+        try:
+            async with session.get(url, headers=headers) as resp:
+                status = resp.status
+                body = await resp.read()
+                etag, last_modified = resp.headers.get('ETag'), resp.headers.get('Last-Modified')
+            throttled = status in THROTTLE_STATUSES
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = str(e) or type(e).__name__
+        finally:
+            latency = time.monotonic() - start
+            elapsed += latency
+            await limiter.release(latency, throttled=throttled)
+
+        if status is not None and status < 400:
+            return FetchResult(url, status, body, None, etag, last_modified, elapsed, attempt, throttled_count)
+        if status is not None:
+            error = f'HTTP {status}'
+            if status not in THROTTLE_STATUSES:
+                break
+            throttled_count += 1
+    return FetchResult(url, status, None, error, None, None, elapsed, attempt, throttled_count)
+
+
+async def _fetch_pages(urls, on_result, max_connections, initial_concurrency, max_concurrency,
+                       timeout, target_latency, retries, backoff, headers, request_headers):
+    limiter = AdaptiveLimiter(initial_concurrency, 1, max_concurrency, target_latency)
+    connector = aiohttp.TCPConnector(limit=max_connections, limit_per_host=max_connections)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout, headers=headers) as session:
+        tasks = [_fetch_one(session, limiter, url, request_headers.get(url), retries, backoff) for url in urls]
+        for task in asyncio.as_completed(tasks):
+            on_result(await task)
+    _logger.info("Async fetch finished with a concurrency limit of %d", limiter.limit)
+
+
+def fetch_pages(urls, on_result, max_connections=16, initial_concurrency=4, max_concurrency=32,
+                timeout=20, target_latency=2.0, retries=2, backoff=0.5, headers=None, request_headers=None):
+    """Fetch ``urls`` concurrently and call ``on_result(FetchResult)`` as each one completes.
+
+    ``max_connections`` bounds the connection pool, ``timeout`` is the
+    deadline of each request in seconds and the number of requests in
+    flight adapts between 1 and ``max_concurrency``. ``on_result`` is called
+    from the calling thread. ``request_headers`` maps URLs to extra headers,
+    e.g. conditional-GET validators; a 304 answer is returned as a
+    successful result without body.
+    """
+    if aiohttp is None:
+        raise RuntimeError("The async fetch engine requires the 'aiohttp' package.")
+    asyncio.run(_fetch_pages(
+        urls, on_result, max_connections, initial_concurrency, max_concurrency,
+        timeout, target_latency, retries, backoff, headers, request_headers or {},
+    ))
@@ -0,0 +1,136 @@
+"""Offline crawler benchmark against the stand-in partner directory.
+
+Crawls a :class:`StandinDirectory` with every fetch scenario, then runs
+both reprocess crons, and reports pages/sec, parse ms/page and upsert
+rows/sec from the instrumentation of the crawl runs. The crawl commits,
+so run it from an Odoo shell on a disposable database::
+
+    $ odoo-bin shell -d partner_bench
+    >>> from odoo.addons.azk_odoo_partner_monitor.tools import crawl_benchmark
+    >>> results = crawl_benchmark.run_benchmark(env, pages=100, latency=0.05, throttle_rate=0.02)
+    >>> print(crawl_benchmark.format_report(results))
+
+Every scenario is run on a new revision of the directory, so the upserts
+mix created, updated and unchanged partners.
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+from .partner_directory_standin import StandinDirectory
+
+_logger = logging.getLogger(__name__)
+
+PARAM_PREFIX = 'azk_odoo_partner_monitor.'
+
+# Settings of each fetch scenario, on top of the benchmark defaults
+SCENARIOS = {
+    'threads-bs4': {'partner_fetch_engine': 'threads', 'partner_parser_backend': 'bs4'},
+    'threads-lxml': {'partner_fetch_engine': 'threads', 'partner_parser_backend': 'lxml'},
+    'async-lxml': {'partner_fetch_engine': 'async', 'partner_parser_backend': 'lxml'},
+    'async-lxml-2-workers': {
+        'partner_fetch_engine': 'async', 'partner_parser_backend': 'lxml', 'partner_parse_workers': '2',
+    },
+}
+
+# (result key, alignment, format spec) of the report table
+REPORT_COLUMNS = [
+    ('scenario', '<', 's'), ('runs', '>', 'd'), ('wall_s', '>', '.2f'), ('pages', '>', 'd'),
+    ('pages_per_s', '>', '.2f'), ('parse_ms_per_page', '>', '.2f'), ('rows', '>', 'd'),
+    ('upsert_rows_per_s', '>', '.1f'), ('retries', '>', 'd'), ('throttled', '>', 'd'),
+]
+
+
+@contextmanager
+def override_params(env, values):
+    """Set module parameters for the duration of the block; a falsy value removes the parameter."""
+    params = env['ir.config_parameter'].sudo()
+    previous = {key: params.get_param(PARAM_PREFIX + key) for key in values}
+    for key, value in values.items():
+        params.set_param(PARAM_PREFIX + key, value)
+    env.cr.commit()
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            params.set_param(PARAM_PREFIX + key, value)
+        env.cr.commit()
+
+
+def measure(env, label, run_type, func):
+    """Call ``func`` and aggregate the crawl runs of ``run_type`` it created."""
+    Run = env['azk.partner.crawl.run'].sudo()
+    last_id = Run.search([], order='id desc', limit=1).id
+    start = time.perf_counter()
+    func()
+    wall = time.perf_counter() - start
+    # Country crawls commit from their own cursors
+    env.cr.commit()
+    env.invalidate_all()
+    runs = Run.search([('id', '>', last_id), ('run_type', '=', run_type)])
+
+    pages = sum(runs.mapped('pages_fetched'))
+    rows = sum(runs.mapped('partners_created')) + sum(runs.mapped('partners_updated')) \
+        + sum(runs.mapped('partners_unchanged'))
+    upsert_time = sum(runs.mapped('upsert_time')) + sum(runs.mapped('history_time'))
+    result = {
+        'scenario': label,
+        'runs': len(runs),
+        'wall_s': wall,
+        'pages': pages,
+        'pages_per_s': pages / wall if wall else 0.0,
+        'parse_ms_per_page': 1000.0 * sum(runs.mapped('parse_time')) / pages if pages else 0.0,
+        'rows': rows,
+        'upsert_rows_per_s': rows / upsert_time if upsert_time else 0.0,
+        'retries': sum(runs.mapped('retries')),
+        'throttled': sum(runs.mapped('throttled')),
+    }
+    _logger.info("Benchmark %s: %s", label, result)
+    return result
+
+
+def run_benchmark(env, scenarios=None, pages=20, partners_per_page=20, countries=8, latency=0.0,
+                  throttle_rate=0.0, error_rate=0.0, reprocess_partners=200):
+    """Benchmark ``fetch_partner_data`` per scenario and both reprocess crons; returns one dict per run."""
+    Partner = env['azk.partner.partner']
+    Country = env['azk.partner.country']
+    results = []
+    with StandinDirectory(pages, partners_per_page, countries, latency, throttle_rate, error_rate) as directory:
+        defaults = {
+            'partner_directory_url': directory.url,
+            'partner_fetch_mode': 'all',
+            'page_cache_enabled': False,
+            'partner_upsert_chunk_size': False,
+        }
+        for name in scenarios or SCENARIOS:
+            directory.revision += 1
+            with override_params(env, dict(defaults, **SCENARIOS[name])):
+                results.append(measure(env, f'fetch {name}', 'fetch', Partner.fetch_partner_data))
+
+        with override_params(env, defaults):
+            directory.revision += 1
+            Partner.search([('partner_url', 'like', directory.url)], limit=reprocess_partners).write(
+                {'to_reprocess_references': True})
+            env.cr.commit()
+            results.append(measure(env, 'reprocess partners', 'partner', Partner.cron_reprocess_flagged_partners))
+
+            directory.revision += 1
+            Country.search([('name', 'in', directory.countries)]).write({'to_reprocess_partners': True})
+            env.cr.commit()
+            results.append(measure(env, 'reprocess countries', 'country', Country.cron_reprocess_flagged_countries))
+        _logger.info("Stand-in directory answered %d requests", directory.requests)
+    return results
+
+
+def format_table(rows, columns):
+    """Render ``rows`` as a text table of ``columns``, given as ``(key, alignment, format spec)``."""
+    widths = {name: max(len(name), 24 if align == '<' else 8) for name, align, _spec in columns}
+    lines = [' '.join(f"{name:{align}{widths[name]}}" for name, align, _spec in columns)]
+    for row in rows:
+        lines.append(' '.join(f"{row[name]:{align}{widths[name]}{spec}}" for name, align, spec in columns))
+    return '\n'.join(lines)
+
+
+def format_report(results):
+    """Render benchmark results as a text table."""
+    return format_table(results, REPORT_COLUMNS)
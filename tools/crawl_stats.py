@@ -0,0 +1,117 @@
+"""Stage timers and counters of a crawl.
+
+A :class:`CrawlStats` travels with a crawl in the ``partner_crawl_stats``
+context key and is drained into the ``azk.partner.crawl.run`` record at
+every checkpoint. It is only fed from the thread that drives the crawl:
+fetch threads and parse processes report their timings through their
+results.
+
+It also gathers the change digest of the run: per kind of change
+(``created``, ``promoted``, ``demoted``, ``references``...) a count, a
+summed delta and the first :data:`DIGEST_SAMPLES` entries.
+"""
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Stage timings, in seconds
+STAGES = ('discovery', 'http_wait', 'parse', 'upsert', 'history')
+
+COUNTERS = (
+    'pages_fetched', 'bytes_fetched', 'retries', 'throttled', 'cache_hits',
+    'partners_created', 'partners_updated', 'partners_unchanged', 'history_rows',
+)
+
+DIGEST_SAMPLES = 20
+
+
+def merge_digest(digest, other):
+    """Return ``digest`` with the counts, deltas and samples of ``other`` added."""
+    merged = dict(digest)
+    for kind, part in other.items():
+        current = merged.get(kind, {'count': 0, 'delta': 0, 'samples': []})
+        merged[kind] = {
+            'count': current['count'] + part['count'],
+            'delta': current['delta'] + part['delta'],
+            'samples': (current['samples'] + part['samples'])[:DIGEST_SAMPLES],
+        }
+    return merged
+
+
+def merge_drained(drained, other):
+    """Return the sum of two results of :meth:`CrawlStats.drain`."""
+    counters = dict(drained.get('counters', {}))
+    for name, value in other['counters'].items():
+        counters[name] = counters.get(name, 0) + value
+    timings = dict(drained.get('timings', {}))
+    for name, seconds in other['timings'].items():
+        timings[name] = timings.get(name, 0.0) + seconds
+    return {
+        'timings': timings,
+        'counters': counters,
+        'digest': merge_digest(drained.get('digest', {}), other['digest']),
+        'elapsed': drained.get('elapsed', 0.0) + other['elapsed'],
+    }
+
+
+class CrawlStats:
+
+    def __init__(self):
+        self.timings = dict.fromkeys(STAGES, 0.0)
+        self.counters = defaultdict(int)
+        self.digest = {}
+        self._drained_at = time.monotonic()
+
+    @contextmanager
+    def stage(self, name, exclude=None):
+        """Add the time spent in the ``with`` block to stage ``name``.
+
+        Time recorded meanwhile for the nested stage ``exclude`` is left out.
+        """
+        start = time.perf_counter()
+        excluded = self.timings[exclude] if exclude else 0.0
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if exclude:
+                elapsed -= self.timings[exclude] - excluded
+            self.timings[name] += elapsed
+
+    def add_time(self, name, seconds):
+        self.timings[name] += seconds
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def note(self, kind, entry, delta=0):
+        """Add a change of ``kind`` described by ``entry`` to the digest."""
+        part = self.digest.setdefault(kind, {'count': 0, 'delta': 0, 'samples': []})
+        part['count'] += 1
+        part['delta'] += delta
+        if len(part['samples']) < DIGEST_SAMPLES:
+            part['samples'].append(entry)
+
+    def count_fetch(self, result):
+        """Account for one ``FetchResult``."""
+        self.timings['http_wait'] += result.elapsed
+        self.counters['retries'] += result.retries
+        self.counters['throttled'] += result.throttled
+        if not result.error:
+            self.counters['pages_fetched'] += 1
+            self.counters['bytes_fetched'] += len(result.body or b'')
+
+    def drain(self):
+        """Return the timings, counters, digest and wall time gathered since the last drain, and reset them."""
+        now = time.monotonic()
+        values = {
+            'timings': self.timings,
+            'counters': dict(self.counters),
+            'digest': self.digest,
+            'elapsed': now - self._drained_at,
+        }
+        self.timings = dict.fromkeys(STAGES, 0.0)
+        self.counters = defaultdict(int)
+        self.digest = {}
+        self._drained_at = now
+        return values
@@ -0,0 +1,193 @@
+"""Synthetic partner dataset of production-like volume.
+
+Fills ``azk.partner.partner``, ``azk.partner.reference`` and
+``azk.partner.status.history`` with generated rows in set-based SQL, so
+that a hundred thousand partners with millions of history rows spread
+over several years take minutes rather than hours. The ORM is bypassed:
+stored computed fields are filled by the same queries, and the caches are
+invalidated at the end.
+
+Generated partners carry an ``odoo_partner_id`` from :data:`SYNTHETIC_ID_BASE`
+up, so they never collide with crawled partners and :func:`clear_dataset`
+can remove them. Random values come from PostgreSQL's ``random()``,
+seeded once per run, so a given set of arguments always produces the
+same dataset. Each batch is committed; run it from an Odoo shell on a
+disposable database::
+
+    >>> from odoo.addons.azk_odoo_partner_monitor.tools import dataset_generator
+    >>> dataset_generator.generate_dataset(env, partners=100000, years=5)
+"""
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+SYNTHETIC_ID_BASE = 900000000
+SYNTHETIC_COUNTRY_PREFIX = 'Synthetic Country '
+
+# Country sizes are skewed (the square of a uniform draw), like on
+# odoo.com where a few countries list most partners. Status ranks follow
+# STATUS_ORDER, ready partners being the most common.
+PARTNER_QUERY = """
+    INSERT INTO azk_partner_partner
+        (name, partner_url, odoo_partner_id, current_status, country_id, first_seen_on,
+         retention_rate, total_references_count, largest_project_size, average_project_size,
+         project_size_bucket, to_reprocess_references, create_uid, create_date, write_uid, write_date)
+    SELECT 'Synthetic Partner ' || g.n,
+           %(base_url)s || '/partners/synthetic-partner-' || g.n || '-' || (%(id_base)s + g.n),
+           %(id_base)s + g.n,
+           (ARRAY['ready', 'silver', 'gold'])[1 + floor(power(random(), 1.5) * 3)::integer],
+           (%(country_ids)s::integer[])[1 + floor(power(random(), 2) * %(country_count)s)::integer],
+           %(today)s::date - floor(random() * %(days)s)::integer,
+           round((50 + random() * 50)::numeric, 1),
+           floor(power(random(), 2) * 400)::integer,
+           v.largest,
+           v.average,
+           CASE WHEN v.average >= 25 THEN '25+' WHEN v.average >= 11 THEN '11-25'
+                WHEN v.average >= 5 THEN '5-10' ELSE '<5' END,
+           FALSE, %(uid)s, %(now)s, %(uid)s, %(now)s
+      FROM generate_series(%(start)s, %(stop)s) AS g(n)
+     CROSS JOIN LATERAL (
+        SELECT round((1 + power(random(), 2) * 60)::numeric, 1) AS average,
+               1 + floor(random() * 250)::integer AS largest
+         WHERE g.n IS NOT NULL
+     ) v
+"""
+
+# ``changes`` rows per partner on average, evenly spaced between the day it
+# was first seen and now, growing towards its current total. Both counts of
+# the last row hold the total, as the validation cron expects, except for a
+# ``mismatch_rate`` share of the partners which gives it something to flag.
+REFERENCE_QUERY = """
+    INSERT INTO azk_partner_reference
+        (partner_id, reference_count, old_reference_count, active, change_date,
+         create_uid, create_date, write_uid, write_date)
+    SELECT p.id,
+           CASE WHEN s.i = s.cnt THEN p.total_references_count + s.mismatch::integer
+                ELSE round(p.total_references_count * s.i::numeric / s.cnt)::integer END,
+           CASE WHEN s.i = s.cnt THEN p.total_references_count + s.mismatch::integer
+                ELSE round(p.total_references_count * (s.i - 1)::numeric / s.cnt)::integer END,
+           TRUE,
+           p.first_seen_on::timestamp + (%(now)s - p.first_seen_on::timestamp) * (s.i::float / s.cnt),
+           %(uid)s, %(now)s, %(uid)s, %(now)s
+      FROM azk_partner_partner p
+     CROSS JOIN LATERAL (
+        SELECT 1 + floor(random() * 2 * %(changes)s)::integer AS cnt,
+               random() < %(mismatch_rate)s AS mismatch
+         WHERE p.id IS NOT NULL
+     ) c
+     CROSS JOIN LATERAL (
+        SELECT i, c.cnt, c.mismatch FROM generate_series(1, c.cnt) AS i
+     ) s
+     WHERE p.odoo_partner_id BETWEEN %(id_from)s AND %(id_to)s
+"""
+
+# Status ranks walk backwards from the current status by a fixed step of
+# one or two, so consecutive statuses always differ and the last change
+# ends on the current status.
+STATUS_QUERY = """
+    INSERT INTO azk_partner_status_history
+        (partner_id, old_status, new_status, change_date, active, change_type,
+         create_uid, create_date, write_uid, write_date)
+    SELECT r.partner_id,
+           (ARRAY['ready', 'silver', 'gold'])[1 + r.old_rank],
+           (ARRAY['ready', 'silver', 'gold'])[1 + r.new_rank],
+           r.first_seen_on + ((%(today)s::date - r.first_seen_on) * r.i / r.cnt),
+           TRUE,
+           CASE WHEN r.new_rank > r.old_rank THEN 'promoted' ELSE 'demoted' END,
+           %(uid)s, %(now)s, %(uid)s, %(now)s
+      FROM (
+        SELECT p.id AS partner_id, p.first_seen_on, s.i, c.cnt,
+               (c.rank + (c.cnt - s.i) * c.step) %% 3 AS new_rank,
+               (c.rank + (c.cnt - s.i + 1) * c.step) %% 3 AS old_rank
+          FROM azk_partner_partner p
+         CROSS JOIN LATERAL (
+            SELECT floor(random() * (2 * %(changes)s + 1))::integer AS cnt,
+                   1 + floor(random() * 2)::integer AS step,
+                   array_position(ARRAY['ready', 'silver', 'gold']::varchar[], p.current_status) - 1 AS rank
+         ) c
+         CROSS JOIN LATERAL generate_series(1, c.cnt) AS s(i)
+         WHERE p.odoo_partner_id BETWEEN %(id_from)s AND %(id_to)s
+      ) r
+"""
+
+
+def generate_dataset(env, partners=100000, countries=120, years=5, reference_changes=20, status_changes=2,
+                     mismatch_rate=0.01, batch_size=10000, seed=0.42):
+    """Insert ``partners`` synthetic partners with their reference and status history.
+
+    Partners are spread over ``countries`` countries and first seen in the
+    last ``years`` years. Each has ``reference_changes`` reference rows and
+    ``status_changes`` status changes on average. Generated partners are
+    appended after the ones of a previous run. Returns the number of rows
+    inserted per table.
+    """
+    cr = env.cr
+    Partner = env['azk.partner.partner']
+    Country = env['azk.partner.country'].sudo()
+    env.flush_all()
+    start_time = time.perf_counter()
+
+    country_map = Country._get_or_create_by_names([f'{SYNTHETIC_COUNTRY_PREFIX}{i}' for i in range(1, countries + 1)])
+    cr.execute("SELECT COALESCE(max(odoo_partner_id), %s) FROM azk_partner_partner WHERE odoo_partner_id >= %s",
+               [SYNTHETIC_ID_BASE, SYNTHETIC_ID_BASE])
+    offset = cr.fetchone()[0] - SYNTHETIC_ID_BASE
+    cr.execute("SELECT setseed(%s)", [seed])
+
+    params = {
+        'base_url': Partner._get_directory_url(),
+        'id_base': SYNTHETIC_ID_BASE,
+        'country_ids': list(country_map.values()),
+        'country_count': len(country_map),
+        'days': max(1, int(years * 365)),
+        'today': env.cr.now().date(),
+        'now': env.cr.now(),
+        'uid': env.uid,
+        'mismatch_rate': mismatch_rate,
+    }
+    counts = dict.fromkeys(['partners', 'references', 'status_changes'], 0)
+    for start in range(offset + 1, offset + partners + 1, batch_size):
+        stop = min(start + batch_size - 1, offset + partners)
+        batch = dict(params, start=start, stop=stop,
+                     id_from=SYNTHETIC_ID_BASE + start, id_to=SYNTHETIC_ID_BASE + stop)
+        cr.execute(PARTNER_QUERY, batch)
+        counts['partners'] += cr.rowcount
+        cr.execute(REFERENCE_QUERY, dict(batch, changes=reference_changes))
+        counts['references'] += cr.rowcount
+        cr.execute(STATUS_QUERY, dict(batch, changes=status_changes))
+        counts['status_changes'] += cr.rowcount
+        cr.commit()
+        _logger.info("Generated synthetic partners %d to %d: %s", start, stop, counts)
+
+    _refresh_country_counts(env)
+    env.invalidate_all()
+    env['azk.partner.stat.snapshot']._capture_snapshot()
+    Partner._bump_dashboard_version()
+    cr.commit()
+    _logger.info("Generated the synthetic dataset in %.1fs: %s", time.perf_counter() - start_time, counts)
+    return counts
+
+
+def clear_dataset(env):
+    """Delete the synthetic partners, their history and the synthetic countries."""
+    env.flush_all()
+    env.cr.execute("DELETE FROM azk_partner_partner WHERE odoo_partner_id >= %s", [SYNTHETIC_ID_BASE])
+    partner_count = env.cr.rowcount
+    env.cr.execute("DELETE FROM azk_partner_country WHERE name LIKE %s", [SYNTHETIC_COUNTRY_PREFIX + '%'])
+    _refresh_country_counts(env)
+    env.invalidate_all()
+    env['azk.partner.partner']._bump_dashboard_version()
+    env.cr.commit()
+    _logger.info("Deleted %d synthetic partners", partner_count)
+    return partner_count
+
+
+def _refresh_country_counts(env):
+    """Recompute the stored partner count of every country, which the inserts bypassed."""
+    env.cr.execute("""
+        UPDATE azk_partner_country c
+           SET total_partner_count = v.count
+          FROM (SELECT c2.id, (SELECT count(*) FROM azk_partner_partner p WHERE p.country_id = c2.id) AS count
+                  FROM azk_partner_country c2) v
+         WHERE c.id = v.id AND c.total_partner_count IS DISTINCT FROM v.count
+    """)
@@ -0,0 +1,161 @@
+"""Database benchmark of the paths that slow down as the history grows.
+
+Times the upsert of a crawl chunk, both validation crons, the dashboard
+and list view calls and the partner report, and counts the queries each
+one sends. Every run happens in a savepoint that is rolled back, so the
+runs of a case all see the same data and the database is left untouched.
+Fill a disposable database with :mod:`dataset_generator` first::
+
+    >>> from odoo.addons.azk_odoo_partner_monitor.tools import dataset_generator, db_benchmark
+    >>> dataset_generator.generate_dataset(env, partners=100000)
+    >>> print(db_benchmark.format_report(db_benchmark.run_db_benchmark(env)))
+
+Keep the printed table (or the returned dicts) as the baseline of a
+change and run the benchmark again on the same dataset afterwards.
+"""
+import logging
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from .crawl_benchmark import format_table
+from .dataset_generator import SYNTHETIC_ID_BASE
+
+_logger = logging.getLogger(__name__)
+
+REPORT_REF = 'azk_odoo_partner_monitor.action_report_partners'
+
+# (result key, alignment, format spec) of the report table
+REPORT_COLUMNS = [
+    ('case', '<', 's'), ('runs', '>', 'd'), ('queries', '>', 'd'),
+    ('first_ms', '>', '.1f'), ('median_ms', '>', '.1f'), ('min_ms', '>', '.1f'),
+]
+
+# Fields read by the partner list view
+LIST_SPECIFICATION = {
+    'name': {},
+    'country_id': {'fields': {'display_name': {}}},
+    'current_status': {},
+    'retention_rate': {},
+    'total_references_count': {},
+    'largest_project_size': {},
+    'average_project_size': {},
+    'to_reprocess_references': {},
+}
+
+
+@contextmanager
+def rolled_back(env):
+    """Run the block in a savepoint that is rolled back afterwards, with empty ORM caches."""
+    env.flush_all()
+    env.invalidate_all()
+    env.cr.execute('SAVEPOINT db_benchmark')
+    try:
+        yield
+    finally:
+        env.cr.execute('ROLLBACK TO SAVEPOINT db_benchmark')
+        env.cr.execute('RELEASE SAVEPOINT db_benchmark')
+        env.cr.clear()
+
+
+def measure(env, label, func, repeat=3):
+    """Run ``func`` ``repeat`` times, each in a rolled back savepoint; returns timings and query count.
+
+    Pending writes are flushed inside the timed block, so the queries they
+    send are counted with the call that made them.
+    """
+    timings, queries = [], 0
+    for _run in range(repeat):
+        with rolled_back(env):
+            query_count = env.cr.sql_log_count
+            start = time.perf_counter()
+            func()
+            env.flush_all()
+            timings.append(1000.0 * (time.perf_counter() - start))
+            queries = env.cr.sql_log_count - query_count
+    result = {
+        'case': label,
+        'runs': repeat,
+        'queries': queries,
+        'first_ms': timings[0],
+        'median_ms': statistics.median(timings),
+        'min_ms': min(timings),
+    }
+    _logger.info("Benchmark %s: %s", label, result)
+    return result
+
+
+def _upsert_case(env, size):
+    """Upsert ``size`` known partners, a share of them changed, plus a tenth of new ones."""
+    Partner = env['azk.partner.partner'].with_context(tracking_disable=True)
+    partners = Partner.search_fetch([], [
+        'name', 'partner_url', 'current_status', 'country_id', 'retention_rate',
+        'total_references_count', 'largest_project_size', 'average_project_size',
+    ], order='id desc', limit=size)
+    statuses = ['ready', 'silver', 'gold']
+    records = []
+    for index, partner in enumerate(partners):
+        status = partner.current_status or 'ready'
+        records.append((partner.name, {
+            'partner_url': partner.partner_url,
+            'current_status': statuses[(statuses.index(status) + 1) % 3] if index % 7 == 0 else status,
+            'country_name': partner.country_id.name or 'Unknown',
+            'retention_rate': partner.retention_rate,
+            'total_references_count': partner.total_references_count + (index % 5 == 0),
+            'largest_project_size': partner.largest_project_size,
+            'average_project_size': partner.average_project_size,
+        }))
+    base_url = Partner._get_directory_url()
+    for index in range(size // 10):
+        odoo_partner_id = SYNTHETIC_ID_BASE - 1 - index
+        records.append((f'Benchmark Partner {index}', {
+            'partner_url': f'{base_url}/partners/benchmark-partner-{odoo_partner_id}',
+            'current_status': 'ready',
+            'country_name': 'Unknown',
+            'retention_rate': 90.0,
+            'total_references_count': index % 50,
+            'largest_project_size': 20,
+            'average_project_size': 8.5,
+        }))
+    return f'upsert {len(records)} partners', lambda: Partner._upsert_partner_records(records)
+
+
+def _report_case(env, size):
+    """Render the partner report of ``size`` partners, as HTML when wkhtmltopdf is unavailable."""
+    Report = env['ir.actions.report']
+    partner_ids = env['azk.partner.partner'].search([], limit=size).ids
+    if Report.get_wkhtmltopdf_state() == 'ok':
+        return f'partner report pdf {len(partner_ids)}', lambda: Report._render_qweb_pdf(REPORT_REF, partner_ids)
+    _logger.warning("wkhtmltopdf is not available, the partner report is benchmarked as HTML")
+    return f'partner report html {len(partner_ids)}', lambda: Report._render_qweb_html(REPORT_REF, partner_ids)
+
+
+def run_db_benchmark(env, repeat=3, upsert_size=1000, report_size=500):
+    """Benchmark the database heavy paths on the current data; returns one dict per case."""
+    Partner = env['azk.partner.partner']
+    Country = env['azk.partner.country']
+    env.cr.execute("""
+        SELECT (SELECT count(*) FROM azk_partner_partner),
+               (SELECT count(*) FROM azk_partner_reference),
+               (SELECT count(*) FROM azk_partner_status_history)
+    """)
+    _logger.info("Benchmarking %d partners, %d reference rows and %d status changes", *env.cr.fetchone())
+
+    last_year = env.cr.now().date() - timedelta(days=365)
+    cases = [
+        _upsert_case(env, upsert_size),
+        ('cron_validate_countries', Country.cron_validate_countries),
+        ('cron_validate_partners', Partner.cron_validate_partners),
+        ('dashboard filter options', Partner.get_dashboard_filter_options),
+        ('dashboard data (snapshot)', lambda: Partner.get_dashboard_data([])),
+        ('dashboard data (live)', lambda: Partner.get_dashboard_data([('first_seen_on', '>=', last_year)])),
+        ('partner list', lambda: Partner.web_search_read([], LIST_SPECIFICATION, limit=80)),
+        _report_case(env, report_size),
+    ]
+    return [measure(env, label, func, repeat) for label, func in cases]
+
+
+def format_report(results):
+    """Render benchmark results as a text table."""
+    return format_table(results, REPORT_COLUMNS)
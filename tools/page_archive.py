@@ -0,0 +1,98 @@
+"""Content-addressed store of compressed page bodies.
+
+Bodies are kept under ``root`` in files named after the SHA-256 of the
+uncompressed body, so a page fetched unchanged on many days is stored
+once. zstd is used when the ``zstandard`` library is installed and gzip
+otherwise; the compression is part of the file name, so both can coexist
+in one archive.
+"""
+import gzip
+import hashlib
+import os
+import tempfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIONS = ('zstd', 'gzip')
+EXTENSIONS = {'zstd': 'zst', 'gzip': 'gz'}
+
+
+def get_compression(preferred='zstd'):
+    """Return ``preferred`` if it is available, gzip otherwise."""
+    if preferred == 'zstd' and zstandard is None:
+        return 'gzip'
+    return preferred if preferred in COMPRESSIONS else 'gzip'
+
+
+def content_hash(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+def body_path(root, digest, compression):
+    return os.path.join(root, digest[:2], f'{digest}.{EXTENSIONS[compression]}')
+
+
+def compress(body, compression):
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(body)
+    return gzip.compress(body, compresslevel=6)
+
+
+def decompress(data, compression):
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Decompressing zstd archives requires the zstandard library.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def write_body(root, body, compression):
+    """Store ``body`` unless an identical one is stored; returns its hash and its stored size.
+
+    Files are written to a temporary name and renamed, so readers never see
+    a partial file. The modification time of an existing file is bumped,
+    which tells the garbage collection it is still in use.
+    """
+    digest = content_hash(body)
+    path = body_path(root, digest, compression)
+    if os.path.exists(path):
+        os.utime(path)
+        return digest, os.path.getsize(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = compress(body, compression)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return digest, len(data)
+
+
+def read_body(root, digest, compression):
+    """Return the stored body of ``digest``, or None when its file is missing."""
+    try:
+        with open(body_path(root, digest, compression), 'rb') as stored:
+            return decompress(stored.read(), compression)
+    except FileNotFoundError:
+        return None
+
+
+def iter_stored(root):
+    """Yield ``(digest, compression, path, mtime)`` of every stored body."""
+    compressions = {ext: compression for compression, ext in EXTENSIONS.items()}
+    if not os.path.isdir(root):
+        return
+    for prefix in os.scandir(root):
+        if not prefix.is_dir():
+            continue
+        for entry in os.scandir(prefix.path):
+            digest, _dot, ext = entry.name.partition('.')
+            if ext in compressions:
+                yield digest, compressions[ext], entry.path, entry.stat().st_mtime
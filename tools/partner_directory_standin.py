@@ -0,0 +1,216 @@
+"""Local stand-in for the odoo.com partner directory.
+
+Serves generated partner-list, country-index and profile pages with the
+markup the parsers of :mod:`partner_parser` expect, so the crawler can be
+exercised and benchmarked without network access. Pages are derived from
+the partner index only, so every run sees the same directory until
+``revision`` is bumped, which changes the status and references of a
+share of the partners.
+
+Point the ``azk_odoo_partner_monitor.partner_directory_url`` parameter at
+:attr:`StandinDirectory.url`, or run it on its own::
+
+    python tools/partner_directory_standin.py --pages 200 --latency 0.05 --throttle-rate 0.02
+"""
+import argparse
+import html
+import logging
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+_logger = logging.getLogger(__name__)
+
+COUNTRY_NAMES = [
+    'Belgium', 'France', 'India', 'United States', 'Germany', 'Spain', 'Mexico', 'Brazil',
+    'Egypt', 'Lebanon', 'Morocco', 'Canada', 'Italy', 'Netherlands', 'Switzerland', 'Kenya',
+]
+STATUSES = ['Gold', 'Silver', 'Ready']
+
+LIST_PATH_RE = re.compile(r'^/partners(?:/country/[a-z0-9\-]+-(?P<country>\d+))?(?:/page/(?P<page>\d+))?/?$')
+PROFILE_PATH_RE = re.compile(r'^/partners/[a-z0-9\-]+-(?P<partner>\d+)/?$')
+
+CARD = """<a class="text-decoration-none row p-2 text-black" href="/partners/{slug}-{id}">
+ <div class="col-md-9"><h5><span>{name}</span> <span class="badge text-bg-warning">{status} Partner</span></h5>
+ <div id="o_wcrm_partners_address"><span>{country}</span></div>
+ <div class="mb-2"><small>Retention <span>{retention}</span>%</small></div>
+ <small class="text-muted">Average Project Size: {average} users</small>
+ <small class="text-muted">Large Project: {largest} users</small></div>
+ <div class="col-md-3 stat_ref"><div>{references} References</div></div></a>"""
+
+PROFILE = """<html><head><meta charset="utf-8"/><title>{name}</title></head><body>
+<div itemprop="address"><span itemprop="streetAddress">{id} Stand-in Street<br/>1000 Stand-in City<br/>{country}</span></div>
+<div class="row"><div class="col stat_size"><h4>Stats</h4><p>Retention <strong>{retention} %</strong></p>
+<p><span>Largest Project</span> {largest} users</p><p><span>Average Project</span> {average} users</p></div>
+<div class="stat_ref"><h3>References - {references}</h3></div></div></body></html>"""
+
+
+class StandinDirectory:
+    """Generated partner directory served over HTTP on a background thread.
+
+    ``pages`` list pages of ``partners_per_page`` partners are spread over
+    ``countries`` countries. Each request waits ``latency`` seconds (with
+    up to 50% jitter) and is answered with a 429 or a 503 with the
+    probabilities ``throttle_rate`` and ``error_rate``.
+    """
+
+    def __init__(self, pages=20, partners_per_page=20, countries=8, latency=0.0,
+                 throttle_rate=0.0, error_rate=0.0, seed=0):
+        self.pages = pages
+        self.partners_per_page = partners_per_page
+        self.countries = COUNTRY_NAMES[:max(1, min(countries, len(COUNTRY_NAMES)))]
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.revision = 0
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def partner_count(self):
+        return self.pages * self.partners_per_page
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self, host='127.0.0.1', port=0):
+        directory = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body = directory.respond(self.path)
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                _logger.debug("Stand-in directory: " + format, *args)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        _logger.info("Stand-in partner directory with %d partners serving on %s", self.partner_count, self.url)
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- generated content ---
+
+    def partner(self, index):
+        """Values of partner ``index``; a share of them changes with each revision."""
+        changed = bool(self.revision) and (index + self.revision) % 7 == 0
+        return {
+            'id': 100000 + index,
+            'slug': f'standin-partner-{index}',
+            'name': f'Stand-in Partner {index}',
+            'status': STATUSES[(index + changed) % 3],
+            'country': self.countries[index % len(self.countries)],
+            'retention': 70 + index % 30,
+            'average': round(3 + (index % 40) * 0.75, 1),
+            'largest': 5 + index % 120,
+            'references': index % 50 + (self.revision if changed else 0),
+        }
+
+    def _country_partners(self, country_index):
+        return range(country_index, self.partner_count, len(self.countries))
+
+    def _list_page(self, partner_indexes, page, url_for):
+        per_page = self.partners_per_page
+        page_count = max(1, -(-len(partner_indexes) // per_page))
+        indexes = partner_indexes[(page - 1) * per_page:page * per_page]
+        cards = ''.join(
+            CARD.format(**{key: html.escape(str(value)) for key, value in self.partner(index).items()})
+            for index in indexes
+        )
+        pagination = ''.join(f'<li><a href="{url_for(p)}">{p}</a></li>' for p in range(1, page_count + 1))
+        countries = ''.join(
+            f'<a href="/partners/country/{name.lower().replace(" ", "-")}-{i + 1}">{html.escape(name)}</a>'
+            for i, name in enumerate(self.countries)
+        )
+        return (
+            f'<html><body><div class="o_countries">{countries}</div>'
+            f'<ul class="pagination">{pagination}</ul>{cards}</body></html>'
+        )
+
+    def respond(self, path):
+        """Return the ``(status, body)`` of a request for ``path``."""
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+            delay = self.latency * (1 + self._random.uniform(-0.5, 0.5)) if self.latency else 0.0
+        if delay:
+            time.sleep(delay)
+        if roll < self.throttle_rate:
+            return 429, b'Too Many Requests'
+        if roll < self.throttle_rate + self.error_rate:
+            return 503, b'Service Unavailable'
+
+        split = urlsplit(path)
+        query = parse_qs(split.query)
+        if match := LIST_PATH_RE.match(split.path):
+            page = int(match['page'] or query.get('page', ['1'])[0])
+            if match['country']:
+                country_index = int(match['country']) - 1
+                if not 0 <= country_index < len(self.countries):
+                    return 404, b'Not Found'
+                base = split.path.split('/page/')[0]
+                body = self._list_page(list(self._country_partners(country_index)), page,
+                                       lambda p: f'{base}/page/{p}')
+            else:
+                body = self._list_page(list(range(self.partner_count)), page,
+                                       lambda p: f'/partners?country_all=1&page={p}')
+            return 200, body.encode()
+        if match := PROFILE_PATH_RE.match(split.path):
+            index = int(match['partner']) - 100000
+            if not 0 <= index < self.partner_count:
+                return 404, b'Not Found'
+            values = {key: html.escape(str(value)) for key, value in self.partner(index).items()}
+            return 200, PROFILE.format(**values).encode()
+        return 404, b'Not Found'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a generated odoo.com partner directory.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8070)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--partners-per-page', type=int, default=20)
+    parser.add_argument('--countries', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds per request")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Share of requests answered with a 429")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with a 503")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    directory = StandinDirectory(
+        args.pages, args.partners_per_page, args.countries,
+        args.latency, args.throttle_rate, args.error_rate,
+    ).start(args.host, args.port)
+    try:
+        directory._thread.join()
+    except KeyboardInterrupt:
+        directory.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Streaming CSV and XLSX writers of the partner export.
+
+Both take an iterable of rows and yield the file in blocks as the rows
+come in, so an export of the whole directory never holds more than one
+block of output. XLSX files cannot be produced front to back: the
+workbook is written in ``constant_memory`` mode to a temporary file,
+which is then streamed.
+"""
+import csv
+import io
+import tempfile
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+BLOCK_SIZE = 64 * 1024
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv;charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def iter_csv(header, rows):
+    """Yield the UTF-8 CSV of ``header`` and ``rows`` in blocks of about :data:`BLOCK_SIZE` bytes."""
+    buffer = io.StringIO()
+    # The BOM makes spreadsheet applications detect the encoding
+    buffer.write('\ufeff')
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= BLOCK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def iter_xlsx(header, rows, sheet_name='Partners'):
+    """Yield the XLSX workbook of ``header`` and ``rows`` in blocks of :data:`BLOCK_SIZE` bytes."""
+    if xlsxwriter is None:
+        raise RuntimeError("The XLSX export requires the xlsxwriter library.")
+    with tempfile.TemporaryFile() as output:
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd'})
+        worksheet = workbook.add_worksheet(sheet_name)
+        worksheet.write_row(0, 0, header, workbook.add_format({'bold': True}))
+        worksheet.freeze_panes(1, 0)
+        for row_index, row in enumerate(rows, 1):
+            worksheet.write_row(row_index, 0, row)
+        workbook.close()
+        output.seek(0)
+        while block := output.read(BLOCK_SIZE):
+            yield block
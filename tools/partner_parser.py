@@ -0,0 +1,430 @@
+"""Parsers for odoo.com partner directory pages.
+
+The functions here are plain module-level functions that only depend on
+the page markup, so they can run inside worker processes of a
+:class:`ParsePool` as well as in the Odoo worker itself.
+
+Two backends produce the same field dicts: ``bs4`` (BeautifulSoup with
+CSS selectors) and ``lxml`` (compiled XPath over an lxml tree), which is
+several times faster per page.
+"""
+import logging
+import multiprocessing
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from urllib.parse import urljoin, urlsplit
+
+from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
+
+_logger = logging.getLogger(__name__)
+
+PARTNER_CARD_SELECTOR = 'a.text-decoration-none.row.p-2.text-black'
+
+# Host the relative profile links of the list pages are resolved against
+DEFAULT_DIRECTORY_URL = 'https://www.odoo.com'
+
+BACKENDS = ('bs4', 'lxml')
+
+COUNTRY_HREF_RE = re.compile(r'/country/([a-z0-9\-]+)-(\d+)')
+# Trailing numeric id of a profile path, e.g. /partners/acme-solutions-1234
+PARTNER_ID_RE = re.compile(r'[/-](\d+)/?$')
+RETENTION_RE = re.compile(r'\d+\s*%')
+REFERENCES_RE = re.compile(r'References\s*-\s*\d+', re.IGNORECASE)
+LARGEST_RE = re.compile('Largest', re.IGNORECASE)
+AVERAGE_RE = re.compile('Average', re.IGNORECASE)
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+XP_CARDS = etree.XPath('//a[%s]' % ' and '.join(
+    _has_class(c) for c in ('text-decoration-none', 'row', 'p-2', 'text-black')))
+XP_CARD_NAME = etree.XPath('.//h5//span')
+XP_CARD_BADGE = etree.XPath(f'.//h5//*[{_has_class("badge")}]')
+XP_CARD_COUNTRY = etree.XPath('.//*[@id="o_wcrm_partners_address"]//span')
+XP_CARD_RETENTION = etree.XPath(f'.//div[{_has_class("mb-2")}]//small//span')
+XP_CARD_REFERENCES = etree.XPath(f'.//div[{_has_class("col-md-3")} and {_has_class("stat_ref")}]/div')
+XP_CARD_STATS = etree.XPath(f'.//small[{_has_class("text-muted")}]')
+XP_PROFILE_ADDRESS = etree.XPath('//span[@itemprop="streetAddress"]')
+XP_PROFILE_SIZE = etree.XPath(f'//div[{_has_class("stat_size")}]')
+XP_PROFILE_REFERENCES = etree.XPath(f'//div[{_has_class("stat_ref")}]')
+XP_COUNTRY_LINKS = etree.XPath('//a[contains(@href, "/partners/country/")]')
+XP_TEXT = etree.XPath('.//text()')
+XP_SPANS = etree.XPath('.//span')
+
+
+def parse_partner_id(url):
+    """Return the numeric odoo.com partner id of a profile URL, or None."""
+    match = PARTNER_ID_RE.search(urlsplit(url or '').path)
+    return int(match.group(1)) if match else None
+
+
+def parse_partner_card(soup_item, base_url=DEFAULT_DIRECTORY_URL):
+    try:
+        name = soup_item.select_one('h5 span').text.strip()
+        profile_url = urljoin(base_url, soup_item.get('href'))
+        badge = soup_item.select_one('h5 .badge')
+        status = 'gold' if badge and 'gold' in badge.text.lower() else \
+                 'silver' if badge and 'silver' in badge.text.lower() else 'ready'
+        country = soup_item.select_one('#o_wcrm_partners_address span')
+        country_name = country.text.strip() if country else 'Unknown'
+        retention_span = soup_item.select_one('div.mb-2 small span')
+        retention = float(retention_span.text.strip()) if retention_span else 0.0
+        ref_div = soup_item.select_one('div.col-md-3.stat_ref > div')
+        ref_count = int(re.search(r'(\d+)', ref_div.text.strip()).group(1)) if ref_div else 0
+
+        largest, average = 0, 0.0
+        for tag in soup_item.select('small.text-muted'):
+            text = tag.text.strip()
+            if text.startswith('Average Project'):
+                match = re.search(r'(\d+(?:\.\d+)?)', text)
+                average = float(match.group(1)) if match else 0.0
+            elif text.startswith('Large Project'):
+                match = re.search(r'(\d+)', text)
+                largest = int(match.group(1)) if match else 0
+
+        return (name, {
+            'partner_url': profile_url,
+            'current_status': status,
+            'country_name': country_name,
+            'retention_rate': retention,
+            'total_references_count': ref_count,
+            'largest_project_size': largest,
+            'average_project_size': average,
+        })
+    except Exception as e:
+        _logger.warning("Failed to parse partner item: %s", e)
+        return None
+
+
+def parse_partner_card_lxml(card, base_url=DEFAULT_DIRECTORY_URL):
+    """lxml counterpart of :func:`parse_partner_card`."""
+    try:
+        name = XP_CARD_NAME(card)[0].text_content().strip()
+        profile_url = urljoin(base_url, card.get('href'))
+        badge = _first_text(XP_CARD_BADGE(card))
+        status = 'gold' if badge is not None and 'gold' in badge.lower() else \
+                 'silver' if badge is not None and 'silver' in badge.lower() else 'ready'
+        country = _first_text(XP_CARD_COUNTRY(card))
+        country_name = country.strip() if country is not None else 'Unknown'
+        retention = _first_text(XP_CARD_RETENTION(card))
+        retention = float(retention.strip()) if retention is not None else 0.0
+        ref_text = _first_text(XP_CARD_REFERENCES(card))
+        ref_count = int(re.search(r'(\d+)', ref_text.strip()).group(1)) if ref_text is not None else 0
+
+        largest, average = 0, 0.0
+        for tag in XP_CARD_STATS(card):
+            text = tag.text_content().strip()
+            if text.startswith('Average Project'):
+                match = re.search(r'(\d+(?:\.\d+)?)', text)
+                average = float(match.group(1)) if match else 0.0
+            elif text.startswith('Large Project'):
+                match = re.search(r'(\d+)', text)
+                largest = int(match.group(1)) if match else 0
+
+        return (name, {
+            'partner_url': profile_url,
+            'current_status': status,
+            'country_name': country_name,
+            'retention_rate': retention,
+            'total_references_count': ref_count,
+            'largest_project_size': largest,
+            'average_project_size': average,
+        })
+    except Exception as e:
+        _logger.warning("Failed to parse partner item: %s", e)
+        return None
+
+
+def parse_partner_profile(soup):
+    """Extract the statistics of a partner profile page from its soup."""
+    try:
+        country_name = "Unknown"
+        address_span = soup.select_one('span[itemprop="streetAddress"]')
+        if address_span:
+            parts = re.split(r'<br\s*/?>', str(address_span), flags=re.IGNORECASE)
+            if parts:
+                last_part = BeautifulSoup(parts[-1], 'html.parser').get_text(strip=True)
+                if last_part:
+                    country_name = last_part
+
+        retention_rate = 0.0
+        stat_size_div = soup.select_one('div.stat_size')
+        if stat_size_div:
+            retention_span = stat_size_div.find(string=RETENTION_RE)
+            if retention_span:
+                match = re.search(r'(\d+)', retention_span)
+                if match:
+                    retention_rate = float(match.group(1))
+
+        largest_project_size = 0
+        average_project_size = 0.0
+        if stat_size_div:
+            largest_tag = stat_size_div.find('span', string=LARGEST_RE)
+            if largest_tag and largest_tag.next_sibling:
+                largest_text = largest_tag.next_sibling.strip()
+                match = re.search(r'(\d+)', largest_text)
+                if match:
+                    largest_project_size = int(match.group(1))
+
+            average_tag = stat_size_div.find('span', string=AVERAGE_RE)
+            if average_tag and average_tag.next_sibling:
+                average_text = average_tag.next_sibling.strip()
+                match = re.search(r'(\d+(?:\.\d+)?)', average_text)
+                if match:
+                    average_project_size = float(match.group(1))
+
+        total_references_count = 0
+        stat_ref_div = soup.select_one('div.stat_ref')
+        if stat_ref_div:
+            heading = stat_ref_div.find(string=REFERENCES_RE)
+            if heading:
+                match = re.search(r'(\d+)', heading)
+                if match:
+                    total_references_count = int(match.group(1))
+
+        return {
+            'country_name': country_name,
+            'retention_rate': retention_rate,
+            'largest_project_size': largest_project_size,
+            'average_project_size': average_project_size,
+            'total_references_count': total_references_count,
+        }
+
+    except Exception as e:
+        _logger.exception("Failed to parse single partner page: %s", e)
+        return {}
+
+
+def parse_partner_profile_lxml(root):
+    """lxml counterpart of :func:`parse_partner_profile`."""
+    try:
+        country_name = "Unknown"
+        address_spans = XP_PROFILE_ADDRESS(root)
+        if address_spans:
+            last_part = ''.join(text.strip() for text in _strings_after_last_br(address_spans[0]))
+            if last_part:
+                country_name = last_part
+
+        retention_rate = 0.0
+        stat_size_divs = XP_PROFILE_SIZE(root)
+        stat_size_div = stat_size_divs[0] if stat_size_divs else None
+        if stat_size_div is not None:
+            retention_span = _find_text(stat_size_div, RETENTION_RE)
+            if retention_span:
+                match = re.search(r'(\d+)', retention_span)
+                if match:
+                    retention_rate = float(match.group(1))
+
+        largest_project_size = 0
+        average_project_size = 0.0
+        if stat_size_div is not None:
+            largest_text = _span_next_text(stat_size_div, LARGEST_RE)
+            if largest_text:
+                match = re.search(r'(\d+)', largest_text.strip())
+                if match:
+                    largest_project_size = int(match.group(1))
+
+            average_text = _span_next_text(stat_size_div, AVERAGE_RE)
+            if average_text:
+                match = re.search(r'(\d+(?:\.\d+)?)', average_text.strip())
+                if match:
+                    average_project_size = float(match.group(1))
+
+        total_references_count = 0
+        stat_ref_divs = XP_PROFILE_REFERENCES(root)
+        if stat_ref_divs:
+            heading = _find_text(stat_ref_divs[0], REFERENCES_RE)
+            if heading:
+                match = re.search(r'(\d+)', heading)
+                if match:
+                    total_references_count = int(match.group(1))
+
+        return {
+            'country_name': country_name,
+            'retention_rate': retention_rate,
+            'largest_project_size': largest_project_size,
+            'average_project_size': average_project_size,
+            'total_references_count': total_references_count,
+        }
+
+    except Exception as e:
+        _logger.exception("Failed to parse single partner page: %s", e)
+        return {}
+
+
+# --- lxml helpers mirroring the BeautifulSoup semantics used above ---
+
+def _first_text(elements):
+    return elements[0].text_content() if elements else None
+
+
+def _find_text(element, pattern):
+    """First text node under ``element`` matching ``pattern`` (bs4 ``find(string=...)``)."""
+    return next((text for text in XP_TEXT(element) if pattern.search(text)), None)
+
+
+def _tag_string(element):
+    """Equivalent of bs4 ``Tag.string``: the only string below a single-child chain."""
+    children = list(element)
+    if not children:
+        return element.text or None
+    if len(children) == 1 and not element.text and not children[0].tail:
+        if not isinstance(children[0].tag, str):
+            return children[0].text
+        return _tag_string(children[0])
+    return None
+
+
+def _span_next_text(element, pattern):
+    """Text following the first span whose string matches ``pattern``."""
+    for span in XP_SPANS(element):
+        string = _tag_string(span)
+        if string is not None and pattern.search(string):
+            if span.tail:
+                return span.tail
+            if span.getnext() is not None:
+                # bs4 would call .strip() on the next tag and fail the whole page
+                raise ValueError("Unexpected markup after %r" % string)
+            return None
+    return None
+
+
+def _strings_after_last_br(element):
+    """Text pieces of ``element`` that follow its last ``<br>``, in document order."""
+    pieces = []
+
+    def walk(node):
+        if node.tag == 'br':
+            pieces.clear()
+        elif isinstance(node.tag, str) and node.text:
+            pieces.append(node.text)
+        for child in node:
+            walk(child)
+            if child.tail:
+                pieces.append(child.tail)
+
+    walk(element)
+    return pieces
+
+
+def _lxml_document(html):
+    if not html.strip():
+        # lxml refuses empty documents, bs4 parses them as a page without content
+        return lxml_html.document_fromstring('<html></html>')
+    if isinstance(html, bytes):
+        return lxml_html.document_fromstring(html, parser=lxml_html.HTMLParser(encoding='utf-8'))
+    return lxml_html.document_fromstring(html)
+
+
+def parse_partner_list(html, backend='bs4', base_url=DEFAULT_DIRECTORY_URL):
+    """Return the ``(name, values)`` tuples of every partner card in a list page."""
+    if backend == 'lxml':
+        return [
+            parsed for card in XP_CARDS(_lxml_document(html))
+            if (parsed := parse_partner_card_lxml(card, base_url))
+        ]
+    soup = BeautifulSoup(html, 'html.parser')
+    return [
+        parsed for card in soup.select(PARTNER_CARD_SELECTOR)
+        if (parsed := parse_partner_card(card, base_url))
+    ]
+
+
+def parse_country_directory(html, backend='bs4'):
+    """Return ``(name, slug, odoo_id)`` for every country linked from the partner index page."""
+    if backend == 'lxml':
+        links = [
+            (''.join(text.strip() for text in XP_TEXT(a)), a.get('href', ''))
+            for a in XP_COUNTRY_LINKS(_lxml_document(html))
+        ]
+    else:
+        soup = BeautifulSoup(html, 'html.parser')
+        links = [(a.get_text(strip=True), a['href']) for a in soup.select('a[href*="/partners/country/"]')]
+    directory = []
+    for name, href in links:
+        match = COUNTRY_HREF_RE.search(href)
+        if name and match:
+            directory.append((name, match.group(1), match.group(2)))
+    return directory
+
+
+def parse_partner_profile_page(html, backend='bs4'):
+    """Return the statistics dict of a partner profile page."""
+    if backend == 'lxml':
+        return parse_partner_profile_lxml(_lxml_document(html))
+    return parse_partner_profile(BeautifulSoup(html, 'html.parser'))
+
+
+# Run by each parse worker before its first task: registers this file under
+# the module name the tasks are pickled with, so the worker can run them
+# without importing the addon package, which would require Odoo.
+_WORKER_BOOTSTRAP = """
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location(name, path)
+module = importlib.util.module_from_spec(spec)
+sys.modules[name] = module
+spec.loader.exec_module(module)
+"""
+
+
+def _timed_parse_partner_list(html, backend, base_url):
+    start = time.perf_counter()
+    records = parse_partner_list(html, backend, base_url)
+    return records, time.perf_counter() - start
+
+
+class ParsePool:
+    """Parse raw partner-list pages in a pool of worker processes.
+
+    ``submit`` hands the raw bytes of a page to the pool and ``results``
+    yields the ``(url, records)`` pairs that are ready, or every pending
+    one when ``block`` is set. ``records`` is None when parsing failed.
+    ``parse_time`` sums the time the workers spent parsing. ``submit``
+    blocks while too many pages are waiting to be parsed, which throttles
+    the fetch stage instead of buffering bodies without bound. Workers are
+    started by a fork server rather than forked from the Odoo worker,
+    whose other threads may hold locks (logging, urllib3) the child would
+    copy and hang on; they only load this module.
+    """
+
+    def __init__(self, workers, backend='bs4', base_url=DEFAULT_DIRECTORY_URL):
+        self.backend = backend
+        self.base_url = base_url
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('forkserver'),
+            initializer=exec, initargs=(_WORKER_BOOTSTRAP, {'name': __name__, 'path': __file__}),
+        )
+        self._pending = {}
+        self._max_pending = 4 * workers
+        self.parse_time = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(cancel_futures=True)
+
+    def submit(self, url, body):
+        running = [future for future in self._pending if not future.done()]
+        if len(running) >= self._max_pending:
+            wait(running, return_when=FIRST_COMPLETED)
+        self._pending[self._executor.submit(_timed_parse_partner_list, body, self.backend, self.base_url)] = url
+
+    def results(self, block=False):
+        done = as_completed(list(self._pending)) if block else [f for f in list(self._pending) if f.done()]
+        for future in done:
+            url = self._pending.pop(future)
+            try:
+                records, elapsed = future.result()
+                self.parse_time += elapsed
+            except Exception as e:
+                _logger.error("Error parsing %s: %s", url, e)
+                records = None
+            yield url, records